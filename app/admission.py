@@ -0,0 +1,116 @@
+import math
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from fastapi import HTTPException, Request
+
+from app.config import settings
+
+
+class TokenBucket:
+    """Classic token bucket; `take` returns 0 when admitted, else seconds until a token frees up."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class AdmissionController:
+    """
+    Per-process admission control for public routes.
+    - Per-client token bucket (429 + Retry-After)
+    - Per-route in-flight cap (503 + Retry-After), checked before the request
+      takes a threadpool slot, so overload is shed instead of queued
+    - Counters of shed requests for the doctor metrics endpoint
+    Limits are read from settings on every call.
+    """
+
+    def __init__(self, max_clients: int = 10_000):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._in_flight: Counter = Counter()
+        self.admitted: Counter = Counter()
+        self.shed: Counter = Counter()
+        self._lock = Lock()
+
+    def enter(self, client: str, route: str) -> None:
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(settings.PUBLIC_RATE_PER_SECOND, settings.PUBLIC_BURST)
+                self._buckets[client] = bucket
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(client)
+
+            # Route cap first: a 503 must not spend the client's token
+            if self._in_flight[route] >= settings.PUBLIC_MAX_CONCURRENCY:
+                self.shed[f"{route}:overloaded"] += 1
+                raise HTTPException(
+                    status_code=503, detail="Server busy, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            wait = bucket.take(time.monotonic())
+            if wait:
+                self.shed[f"{route}:rate_limited"] += 1
+                raise HTTPException(
+                    status_code=429, detail="Too many requests",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+            self._in_flight[route] += 1
+            self.admitted[route] += 1
+
+    def leave(self, route: str) -> None:
+        with self._lock:
+            self._in_flight[route] -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "admitted": dict(self.admitted),
+                "shed": dict(self.shed),
+                "in_flight": {k: v for k, v in self._in_flight.items() if v},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._in_flight.clear()
+            self.admitted.clear()
+            self.shed.clear()
+
+
+controller = AdmissionController()
+
+
+def _client_id(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def admit(route: str):
+    """
+    Dependency factory guarding a public route. Declared async so it runs on the
+    event loop, before the sync endpoint is dispatched to the threadpool.
+    """
+    async def _admit(request: Request):
+        if not settings.ADMISSION_ENABLED:
+            yield
+            return
+        controller.enter(_client_id(request), route)
+        try:
+            yield
+        finally:
+            controller.leave(route)
+
+    return _admit
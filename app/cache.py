@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+
+
+class VersionedCache:
+    """
+    Process-local LRU cache whose entries are tagged with the calendar version.
+
+    Each uvicorn worker keeps its own instance. Entries are only served while
+    their version equals the current one read from the DB (see
+    app.db.get_calendar_version), so a mutation committed by any worker
+    invalidates every worker's cache on its next lookup.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple[int, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, version: int, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or hit[0] != version:
+                return default
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: Hashable, version: int, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, version: int, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for (key, version), computing and storing it on a miss."""
+        missing = object()
+        value = self.get(key, version, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class TTLCache:
+    """Process-local LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            if hit[0] <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store `value` for `ttl` seconds (default: the cache-wide ttl)."""
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,111 @@
+import functools
+import gzip
+import importlib.util
+
+from app.config import settings
+
+
+@functools.lru_cache(maxsize=None)
+def brotli_available() -> bool:
+    """Optional: `pip install brotli` enables Content-Encoding: br. Checked without importing it."""
+    return importlib.util.find_spec("brotli") is not None
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """
+    Negotiate br (if available) or gzip from an Accept-Encoding header; '' for identity.
+    Picks the highest q value (`*` covers unlisted codings; identity only competes
+    when listed); on a tie compression wins, br before gzip. Identity stays the
+    fallback when nothing else is acceptable, even under `identity;q=0`.
+    """
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            offered[name.strip().lower()] = q
+
+    default = offered.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli_available() else ["gzip"]
+    best, best_q = "", offered.get("identity", 0.0)  # unlisted identity: lowest preference
+    for coding in candidates:
+        q = offered.get(coding, default)
+        if q > 0 and (q > best_q or (q == best_q and not best)):
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli  # optional; only reached when brotli_available()
+
+        return brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing single-message responses above COMPRESSION_MIN_SIZE.
+    Streamed bodies and responses that already carry a Content-Encoding pass through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept)
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+
+        async def _send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                return await send(message)
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = [(k, v) for k, v in start["headers"]]
+            names = {k.lower() for k, _ in headers}
+            if (
+                message.get("more_body")
+                or b"content-encoding" in names
+                or len(body) < settings.COMPRESSION_MIN_SIZE
+            ):
+                await send(start)
+                return await send(message)
+
+            body = compress(body, encoding)
+            # The strong ETag names the identity bytes; the encoded body only matches weakly
+            headers = [
+                (k, b"W/" + v if k.lower() == b"etag" and not v.startswith(b"W/") else v)
+                for k, v in headers
+                if k.lower() != b"content-length"
+            ]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, _send)
@@ -11,8 +11,39 @@ class Settings(BaseSettings):
     BASIC_AUTH_USERNAME: str = "doctor"
     BASIC_AUTH_PASSWORD: str = "change-me"
 
+    # --- Database ---
+    DATABASE_URL: str = "sqlite:///./app.db"
+
     # --- App behavior ---
     BOOKING_SLOT_MINUTES: int = 30
 
+    # --- Startup ---
+    DB_STARTUP_MODE: str = "verify"         # verify (skip create_all when schema stamp matches) | create
+
+    # --- Idempotency-Key for public bookings ---
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_CACHE_SIZE: int = 1024
+
+    # --- Waitlist ---
+    WAITLIST_OFFER_MINUTES: int = 15        # how long a freed slot is held for a waiter
+    WAITLIST_SWEEP_SECONDS: float = 30.0    # worker sweep: expire offers, retire past entries, drain missed freed slots
+
+    # --- Profiling (opt-in) ---
+    PROFILE_ALL_REQUESTS: bool = False      # otherwise only doctor requests with `X-Profile: 1`
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_RING_SIZE: int = 50             # traces kept per worker
+
+    # --- Response compression ---
+    COMPRESSION_MIN_SIZE: int = 1024        # bytes; smaller bodies are sent as-is
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4                 # used only if the optional `brotli` package is installed
+
+    # --- Admission control (public endpoints) ---
+    ADMISSION_ENABLED: bool = True
+    PUBLIC_RATE_PER_SECOND: float = 10.0    # token refill per client
+    PUBLIC_BURST: int = 20                  # token bucket capacity per client
+    PUBLIC_MAX_CONCURRENCY: int = 8         # in-flight requests per route
+    SLOTS_MAX_WINDOW_DAYS: int = 31         # max 'to' - 'from' for slot/block search
+
 
 settings = Settings()
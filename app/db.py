@@ -1,13 +1,49 @@
+import time
+import zlib
+from sqlalchemy import event, text, update
 from sqlmodel import SQLModel, create_engine, Session, select
-from app.model import Doctor
+from app.model import Doctor, CalendarVersion, ChangeLog, DailyStats, Appointment, DailyAvailability, _utcnow_naive
 from app.config import settings
 
-# SQLite (single file). For another RDB, replace the URL accordingly.
-engine = create_engine("sqlite:///./app.db", connect_args={"check_same_thread": False})
+# SQLite (single file, DATABASE_URL). For another RDB, replace the URL accordingly.
+engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
 
-def init_db() -> None:
-    """Create tables and seed a single default Doctor if missing."""
-    SQLModel.metadata.create_all(engine)
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _record) -> None:
+    """WAL lets readers in other worker processes proceed while one worker writes."""
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.close()
+
+def _schema_version() -> int:
+    """
+    Fingerprint of the SQLModel metadata (tables, columns, types), computed without
+    touching the DB. Fits SQLite's 32-bit PRAGMA user_version.
+    """
+    desc = ";".join(
+        f"{t.name}(" + ",".join(f"{c.name}:{c.type}" for c in t.columns) + ")"
+        for t in sorted(SQLModel.metadata.tables.values(), key=lambda t: t.name)
+    )
+    return zlib.crc32(desc.encode()) & 0x7FFFFFFF
+
+SCHEMA_VERSION = _schema_version()
+
+def init_db() -> dict:
+    """
+    Create tables, seed a single default Doctor and the calendar version row, bootstrap aggregates.
+    - DB_STARTUP_MODE=verify (default): if PRAGMA user_version already equals SCHEMA_VERSION,
+      skip create_all (per-table reflection) and the aggregates bootstrap; only seed rows are checked
+    - DB_STARTUP_MODE=create: always run the full path
+    Returns timings in milliseconds.
+    """
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        stored = conn.execute(text("PRAGMA user_version")).scalar()
+    fast = settings.DB_STARTUP_MODE == "verify" and stored == SCHEMA_VERSION
+
+    if not fast:
+        SQLModel.metadata.create_all(engine)
     with Session(engine) as session:
         doctor = session.exec(select(Doctor)).first()
         if not doctor:
@@ -16,8 +52,46 @@ def init_db() -> None:
                 # Use model defaults for timezone; do not depend on removed DEFAULT_TZ
                 booking_slot_minutes=settings.BOOKING_SLOT_MINUTES,
             ))
-            session.commit()
+        if not session.get(CalendarVersion, 1):
+            # Seed from the clock so a recreated database never reuses an old version
+            session.add(CalendarVersion(id=1, version=time.time_ns() // 1000))
+        # Bootstrap analytics aggregates for data that predates the DailyStats table
+        if not fast and session.exec(select(DailyStats)).first() is None and (
+            session.exec(select(Appointment.id)).first() or session.exec(select(DailyAvailability.id)).first()
+        ):
+            from app.services.stats import rebuild_daily_stats
+            rebuild_daily_stats(session)
+        session.commit()
+    if not fast:
+        with engine.begin() as conn:
+            conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+    return {"init_db_ms": (time.perf_counter() - t0) * 1000, "schema_fast_path": fast}
 
 def get_session() -> Session:
     """Session factory (caller is responsible for closing)."""
     return Session(engine)
+
+def get_calendar_version(session) -> int:
+    """Current calendar version; shared by all worker processes through the DB."""
+    row = session.get(CalendarVersion, 1)
+    return row.version if row else 0
+
+def bump_calendar_version(session) -> None:
+    """
+    Increment the calendar version inside the caller's transaction,
+    so the bump becomes visible atomically with the change itself.
+    Mutations normally go through record_change(), which calls this.
+    """
+    session.execute(
+        update(CalendarVersion)
+        .where(CalendarVersion.id == 1)
+        .values(version=CalendarVersion.version + 1, updated_at=_utcnow_naive())
+    )
+
+def record_change(session, entity: str, entity_id: str, op: str = "upsert") -> None:
+    """
+    Append a ChangeLog entry and bump the calendar version, both inside the caller's
+    transaction. Call before session.commit() in every availability/appointment mutation.
+    """
+    session.add(ChangeLog(entity=entity, entity_id=entity_id, op=op))
+    bump_calendar_version(session)
@@ -1,16 +1,36 @@
 # app/main.py
+import time
+_IMPORT_T0 = time.perf_counter()
+
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from app.db import init_db
+from app.compression import CompressionMiddleware
+from app.db import engine, init_db
+from app.profiling import ProfilingMiddleware, install_sql_hooks
 from app.routers import public, doctor
+from app.services.waitlist import worker as waitlist_worker
+
+logger = logging.getLogger("app.startup")
+IMPORT_MS = (time.perf_counter() - _IMPORT_T0) * 1000
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    timings = {"import_ms": IMPORT_MS, **init_db()}
+    app.state.startup_timings = timings
+    logger.info(
+        "startup: import %.1f ms, init_db %.1f ms (schema fast path: %s)",
+        timings["import_ms"], timings["init_db_ms"], timings["schema_fast_path"],
+    )
+    await waitlist_worker.start()
     yield
+    await waitlist_worker.stop()
 
 app = FastAPI(title="Clinic SaaS MVP", lifespan=lifespan)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+install_sql_hooks(engine)
 app.include_router(public.router, prefix="/api/public", tags=["public"])
 app.include_router(doctor.router, prefix="/api/doctor", tags=["doctor"])
 
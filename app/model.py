@@ -1,5 +1,6 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 def _uuid() -> str:
@@ -36,3 +37,71 @@ class Appointment(SQLModel, table=True):
     status: str = "scheduled"
     created_at: datetime = Field(default_factory=_utcnow_naive)
     updated_at: datetime = Field(default_factory=_utcnow_naive)
+
+class CalendarVersion(SQLModel, table=True):
+    """Single-row change counter; bumped in the same transaction as every calendar mutation."""
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
+    updated_at: datetime = Field(default_factory=_utcnow_naive)
+
+class ChangeLog(SQLModel, table=True):
+    """Append-only change sequence (with tombstones) backing delta sync."""
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    entity: str = Field(index=True)      # "appointment" | "availability"
+    entity_id: str = Field(index=True)
+    op: str                              # "upsert" | "delete"
+    changed_at: datetime = Field(default_factory=_utcnow_naive)
+
+class DailyStats(SQLModel, table=True):
+    """Per-day aggregates (UTC days), maintained incrementally by every mutation."""
+    doctor_id: str = Field(foreign_key="doctor.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    available_minutes: int = 0
+    booked_minutes: int = 0          # scheduled + completed + no_show
+    scheduled_count: int = 0
+    completed_count: int = 0
+    no_show_count: int = 0
+    canceled_count: int = 0
+
+class IdempotencyKey(SQLModel, table=True):
+    """Stored response of a booking made with an Idempotency-Key header."""
+    key: str = Field(primary_key=True)
+    request_hash: str
+    status_code: int = 201
+    response_json: str
+    created_at: datetime = Field(default_factory=_utcnow_naive, index=True)
+
+class WaitlistEntry(SQLModel, table=True):
+    """Patient interest in any freed slot inside [range_start, range_end) (UTC-naive)."""
+    __table_args__ = (
+        # Matching seeks live 'waiting' entries by range_start and filters range_end
+        # in the index, then sorts only the covering candidates by created_at;
+        # the sweep retires ranges that have ended
+        Index("ix_waitlist_range", "doctor_id", "status", "range_start", "range_end", "created_at"),
+    )
+    id: str = Field(default_factory=_uuid, primary_key=True)
+    doctor_id: str = Field(foreign_key="doctor.id")
+    patient_name: str
+    note: Optional[str] = None
+    range_start: datetime
+    range_end: datetime
+    status: str = "waiting"              # waiting | offered | booked | lapsed | expired
+    created_at: datetime = Field(default_factory=_utcnow_naive)
+
+class SlotOffer(SQLModel, table=True):
+    """A freed slot held for one waitlist entry until expires_at."""
+    id: str = Field(default_factory=_uuid, primary_key=True)
+    waitlist_id: str = Field(foreign_key="waitlistentry.id", index=True)
+    doctor_id: str = Field(foreign_key="doctor.id")
+    start_at: datetime = Field(index=True)
+    end_at: datetime
+    expires_at: datetime = Field(index=True)
+    status: str = "pending"              # pending | accepted | expired
+    created_at: datetime = Field(default_factory=_utcnow_naive)
+
+class FreedSlot(SQLModel, table=True):
+    """Outbox of canceled slots, written with the cancel and drained by the waitlist worker."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    start_at: datetime
+    end_at: datetime
+    created_at: datetime = Field(default_factory=_utcnow_naive)
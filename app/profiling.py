@@ -0,0 +1,207 @@
+import asyncio
+import base64
+import functools
+import inspect
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import Headers
+
+from app.config import settings
+
+PROFILE_HEADER = "X-Profile"
+TRACE_ID_HEADER = "X-Trace-Id"
+
+_current: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+# Last N finished traces (this worker process only)
+traces: deque = deque(maxlen=settings.PROFILE_RING_SIZE)
+
+
+class RequestTrace:
+    """Sampled stacks and SQL timings for one request."""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.status_code: Optional[int] = None
+        self.duration_ms = 0.0
+        self.sql: list = []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.threads: set = set()       # idents of threads currently running the endpoint
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # --- sampling ---
+    def start_sampling(self, interval_s: float) -> None:
+        self._sampler = threading.Thread(target=self._sample_loop, args=(interval_s,), daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self) -> None:
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+
+    def _sample_loop(self, interval_s: float) -> None:
+        while not self._stop.wait(interval_s):
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "sql_count": len(self.sql),
+            "sql_ms": round(sum(q["duration_ms"] for q in self.sql), 3),
+            "samples": self.samples,
+        }
+
+    def detail(self, top: int = 20) -> dict:
+        return {
+            **self.summary(),
+            "sql": self.sql,
+            "stacks": [{"stack": s, "samples": n} for s, n in self.stacks.most_common(top)],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Hooks
+# ---------------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("_trace_t0", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    if trace is None:
+        return
+    starts = conn.info.get("_trace_t0")
+    if not starts:
+        return
+    # Parameters are deliberately not recorded (patient data)
+    trace.sql.append({
+        "statement": statement,
+        "duration_ms": round((time.perf_counter() - starts.pop()) * 1000, 3),
+    })
+
+def install_sql_hooks(engine) -> None:
+    """Record statement timings for traced requests; a ContextVar lookup otherwise."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _traced(fn):
+    """Register the thread running a sync endpoint with the active trace, for the sampler."""
+    if inspect.iscoroutinefunction(fn):
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        trace = _current.get()
+        if trace is None:
+            return fn(*args, **kwargs)
+        ident = threading.get_ident()
+        trace.threads.add(ident)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            trace.threads.discard(ident)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint can be sampled when the request is traced."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _traced(endpoint), **kwargs)
+
+
+def _is_doctor(headers: Headers) -> bool:
+    header = headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        username, _, password = base64.b64decode(token).decode().partition(":")
+    except (ValueError, UnicodeDecodeError):
+        return False
+    return secrets.compare_digest(username, settings.BASIC_AUTH_USERNAME) and secrets.compare_digest(
+        password, settings.BASIC_AUTH_PASSWORD
+    )
+
+
+def should_trace(headers: Headers) -> bool:
+    if settings.PROFILE_ALL_REQUESTS:
+        return True
+    return headers.get(PROFILE_HEADER) == "1" and _is_doctor(headers)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware for opt-in per-request tracing: PROFILE_ALL_REQUESTS, or
+    `X-Profile: 1` together with valid doctor credentials. Untraced requests
+    pay one header check and go straight to the app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not should_trace(Headers(scope=scope)):
+            return await self.app(scope, receive, send)
+
+        trace = RequestTrace(scope["method"], scope["path"])
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((TRACE_ID_HEADER.lower().encode(), trace.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(trace)
+        trace.start_sampling(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            trace.duration_ms = (time.perf_counter() - t0) * 1000
+            _current.reset(token)
+            # join() waits up to one sample interval; keep it off the event loop
+            await asyncio.to_thread(trace.stop_sampling)
+            traces.append(trace)
+
+
+def get_trace(trace_id: str) -> Optional[RequestTrace]:
+    for trace in traces:
+        if trace.id == trace_id:
+            return trace
+    return None
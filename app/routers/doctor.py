@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Header, Response
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlmodel import select
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
+from app.admission import controller as admission
+from app import profiling
+from app.profiling import ProfiledRoute
 from app.config import settings
-from app.db import get_session
-from app.model import Doctor, DailyAvailability, Appointment
-from app.schemas import AvailabilityCreate, AvailabilityRead, AppointmentRead, AppointmentStatusUpdate
+from app.db import get_session, record_change
+from app.model import Doctor, DailyAvailability, Appointment, _utcnow_naive
+from app.schemas import (
+    AvailabilityCreate, AvailabilityRead, AppointmentRead, AppointmentStatusUpdate, ChangesRead, AnalyticsRow,
+)
+from app.services.ical import default_range, feed_validators, http_date, is_not_modified, render_feed
+from app.services.stats import apply_availability, apply_appointment, summarize
+from app.services.sync import changes_since
+from app.services.waitlist import record_freed_slot, worker as waitlist_worker
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 security = HTTPBasic()
 
 # ---------------------------------------------------------------------------
@@ -46,7 +57,7 @@ def _ensure_future_window(start: datetime, end: datetime):
     if start <= now:
         raise HTTPException(400, detail="Availability must start in the future")
 
-def get_doctor_id(session) -> str:
+def get_doctor(session) -> Doctor:
     """
     Retrieve the single doctor record from DB.
     This system assumes a single doctor instance.
@@ -54,7 +65,13 @@ def get_doctor_id(session) -> str:
     doc = session.exec(select(Doctor)).first()
     if not doc:
         raise HTTPException(500, "Doctor not initialized")
-    return doc.id
+    return doc
+
+def get_doctor_id(session) -> str:
+    """
+    ID of the single doctor (see get_doctor).
+    """
+    return get_doctor(session).id
 
 # ---------------------------------------------------------------------------
 # Routes: Availability management
@@ -105,6 +122,8 @@ def create_availability(payload: AvailabilityCreate, _: None = Depends(auth)):
             is_active=payload.is_active,
         )
         session.add(row)
+        apply_availability(session, row)
+        record_change(session, "availability", row.id)
         session.commit()
         session.refresh(row)
         return row
@@ -150,10 +169,13 @@ def update_availability(avail_id: str, payload: AvailabilityCreate, _: None = De
         if bad_appt:
             raise HTTPException(400, "Existing appointments fall outside updated availability.")
 
+        apply_availability(session, row, -1)
         row.start_at = s
         row.end_at = e
         row.is_active = payload.is_active
         session.add(row)
+        apply_availability(session, row)
+        record_change(session, "availability", row.id)
         session.commit()
         session.refresh(row)
         return row
@@ -169,7 +191,9 @@ def delete_availability(avail_id: str = Path(...), _: None = Depends(auth)):
         row = session.get(DailyAvailability, avail_id)
         if not row or row.doctor_id != doctor_id:
             raise HTTPException(404, "availability not found")
+        apply_availability(session, row, -1)
         session.delete(row)
+        record_change(session, "availability", row.id, "delete")
         session.commit()
         return
 
@@ -177,23 +201,46 @@ def delete_availability(avail_id: str = Path(...), _: None = Depends(auth)):
 # Routes: Appointment management
 # ---------------------------------------------------------------------------
 
+def _parse_fields(fields: str) -> list[str]:
+    """
+    Validate a comma-separated sparse fieldset against AppointmentRead.
+    """
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in AppointmentRead.model_fields]
+    if not names or unknown:
+        raise HTTPException(422, f"Invalid fields: {', '.join(unknown) or fields!r}")
+    return list(dict.fromkeys(names))
+
 @router.get("/appointments", response_model=list[AppointmentRead])
-def list_appointments(status: str = "all", _: None = Depends(auth)):
+def list_appointments(status: str = "all", fields: Optional[str] = None, _: None = Depends(auth)):
     """
     List appointments, optionally filtered by status.
     Status can be: all | scheduled | completed | no_show | canceled
+    `fields=id,start_at,status` selects only those columns and returns only those keys.
     """
     allowed = {"all", "scheduled", "completed", "no_show", "canceled"}
     if status not in allowed:
         raise HTTPException(422, "Invalid status filter")
+    cols = _parse_fields(fields) if fields is not None else None
 
     with get_session() as session:
         doctor_id = get_doctor_id(session)
-        stmt = select(Appointment).where(Appointment.doctor_id == doctor_id)
+        if cols is None:
+            stmt = select(Appointment).where(Appointment.doctor_id == doctor_id)
+            if status != "all":
+                stmt = stmt.where(Appointment.status == status)
+            rows = session.exec(stmt.order_by(Appointment.start_at)).all()
+            return rows
+
+        stmt = select(*[getattr(Appointment, c) for c in cols]).where(Appointment.doctor_id == doctor_id)
         if status != "all":
             stmt = stmt.where(Appointment.status == status)
-        rows = session.exec(stmt.order_by(Appointment.start_at)).all()
-        return rows
+        rows = session.execute(stmt.order_by(Appointment.start_at)).all()
+    # Bypass response_model: rows are already narrowed and JSON-ready
+    return JSONResponse([
+        {c: v.isoformat() if isinstance(v, datetime) else v for c, v in zip(cols, row)}
+        for row in rows
+    ])
 
 @router.patch("/appointments/{appt_id}", response_model=AppointmentRead)
 def update_appointment_status_api(
@@ -214,8 +261,129 @@ def update_appointment_status_api(
         if new_status not in allowed:
             raise HTTPException(422, "Invalid status value")
 
+        freed = appt.status == "scheduled" and new_status == "canceled"
+        if new_status != appt.status:
+            apply_appointment(session, appt, -1)
+            apply_appointment(session, appt, 1, new_status)
         appt.status = new_status
+        appt.updated_at = _utcnow_naive()
         session.add(appt)
+        record_change(session, "appointment", appt.id)
+        if freed:
+            record_freed_slot(session, appt)
         session.commit()
         session.refresh(appt)
+        if freed:
+            # Matching runs on the background worker; this request returns immediately
+            waitlist_worker.notify()
         return appt
+
+# ---------------------------------------------------------------------------
+# Routes: Analytics
+# ---------------------------------------------------------------------------
+
+@router.get("/analytics", response_model=list[AnalyticsRow])
+def get_analytics(
+    from_: date = Query(..., alias="from"),
+    to: date = Query(...),
+    group: str = "day",
+    _: None = Depends(auth),
+):
+    """
+    Booked vs. available minutes and no-show rate per day or ISO week (UTC days, inclusive range).
+    Served from the incrementally maintained DailyStats table.
+    """
+    if group not in {"day", "week"}:
+        raise HTTPException(422, "Invalid group (day | week)")
+    if to < from_:
+        raise HTTPException(422, detail="'to' must not be before 'from'")
+    with get_session() as session:
+        doctor_id = get_doctor_id(session)
+        return summarize(session, doctor_id, from_, to, group)
+
+# ---------------------------------------------------------------------------
+# Routes: Admission metrics
+# ---------------------------------------------------------------------------
+
+@router.get("/admission")
+def get_admission_metrics(_: None = Depends(auth)):
+    """
+    Admitted / shed request counters for public routes (this worker process only).
+    """
+    return admission.snapshot()
+
+# ---------------------------------------------------------------------------
+# Routes: Request traces (opt-in profiler)
+# ---------------------------------------------------------------------------
+
+@router.get("/traces")
+def list_traces(_: None = Depends(auth)):
+    """
+    Summaries of the last traced requests in this worker, newest first.
+    Trace a request with PROFILE_ALL_REQUESTS or `X-Profile: 1` plus doctor credentials.
+    """
+    return [t.summary() for t in reversed(profiling.traces)]
+
+@router.get("/traces/{trace_id}")
+def get_trace(trace_id: str, _: None = Depends(auth)):
+    """
+    Full trace: SQL statements with timings and the hottest sampled stacks.
+    """
+    trace = profiling.get_trace(trace_id)
+    if not trace:
+        raise HTTPException(404, "trace not found")
+    return trace.detail()
+
+# ---------------------------------------------------------------------------
+# Routes: Delta sync
+# ---------------------------------------------------------------------------
+
+@router.get("/changes", response_model=ChangesRead)
+def list_changes(since: Optional[int] = Query(None, ge=0), _: None = Depends(auth)):
+    """
+    Appointments and availabilities changed after the `since` token.
+    Omit `since` for a full snapshot; store the returned token for the next call.
+    """
+    with get_session() as session:
+        doctor_id = get_doctor_id(session)
+        return changes_since(session, doctor_id, since)
+
+# ---------------------------------------------------------------------------
+# Routes: Calendar feed
+# ---------------------------------------------------------------------------
+
+ICS_MAX_RANGE = timedelta(days=366)
+
+@router.get("/calendar.ics")
+def calendar_feed(
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    _: None = Depends(auth),
+):
+    """
+    iCalendar feed of appointments and active availabilities.
+    - Default range: 30 days back to 90 days ahead; at most 366 days
+    - Cached per calendar version; honours If-None-Match / If-Modified-Since (304)
+    - Validators come from the version row, so a 304 never renders or reads appointments
+    """
+    d_start, d_end = default_range(_to_utc_naive(datetime.now(timezone.utc)))
+    s = _to_utc_naive(from_) if from_ else d_start
+    e = _to_utc_naive(to) if to else d_end
+    if e <= s:
+        raise HTTPException(422, detail="'to' must be after 'from'")
+    if e - s > ICS_MAX_RANGE:
+        raise HTTPException(422, detail="Range must not exceed 366 days")
+
+    with get_session() as session:
+        version, etag, last_modified = feed_validators(session, s, e)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if last_modified is not None:
+            headers["Last-Modified"] = http_date(last_modified)
+        if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+            return Response(status_code=304, headers=headers)
+
+        doctor = get_doctor(session)
+        body = render_feed(session, doctor, s, e, version)
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
@@ -1,30 +1,116 @@
 # app/routers/public.py
-from datetime import datetime
-from fastapi import APIRouter, Query, HTTPException
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, HTTPException, Header
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from app.admission import admit
+from app.profiling import ProfiledRoute
+from app.config import settings
 from app.db import get_session
-from app.schemas import AppointmentCreate, AppointmentRead, SlotRead
+from app.schemas import AppointmentCreate, AppointmentRead, SlotRead, WaitlistCreate, WaitlistRead
 from app.services.appointments import create_appointment
-from app.services.slots import list_free_slots  # これが必要
+from app.services import idempotency, waitlist
+from app.services.slots import cached_free_slots, list_free_blocks  # これが必要
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/health")
 def health():
     return {"ok": True}
 
-@router.post("/appointments", response_model=AppointmentRead, status_code=201)
-def create_appointment_api(payload: AppointmentCreate):
+def _replay(stored) -> JSONResponse:
+    status_code, body = stored
+    return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+def _check_window(from_: datetime, to: datetime) -> None:
+    if to <= from_:
+        raise HTTPException(status_code=422, detail="'to' must be after 'from'")
+    if to - from_ > timedelta(days=settings.SLOTS_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=422, detail=f"Window must not exceed {settings.SLOTS_MAX_WINDOW_DAYS} days"
+        )
+
+@router.post(
+    "/appointments", response_model=AppointmentRead, status_code=201,
+    dependencies=[Depends(admit("appointments"))],
+)
+def create_appointment_api(
+    payload: AppointmentCreate,
+    idempotency_key: Optional[str] = Header(None),
+):
+    """
+    Book an appointment. With an `Idempotency-Key` header, retries of the same
+    request return the original 201 response without re-running the conflict checks.
+    """
     with get_session() as session:
-        appt = create_appointment(session, payload)
-        return appt
+        if idempotency_key is None:
+            return create_appointment(session, payload)
+
+        key = idempotency.validate_key(idempotency_key)
+        req_hash = idempotency.request_hash(payload)
+        stored = idempotency.lookup(session, key, req_hash)
+        if stored:
+            return _replay(stored)
+        try:
+            return create_appointment(session, payload, (key, req_hash))
+        except (HTTPException, IntegrityError) as exc:
+            if isinstance(exc, HTTPException) and exc.status_code != 409:
+                raise
+            # A concurrent retry with the same key may have committed first
+            session.rollback()
+            stored = idempotency.lookup(session, key, req_hash)
+            if stored:
+                return _replay(stored)
+            raise
 
 # ★ これが必要です
-@router.get("/slots", response_model=list[SlotRead])
+@router.get("/slots", response_model=list[SlotRead], dependencies=[Depends(admit("slots"))])
 def get_slots(
     from_: datetime = Query(..., alias="from"),
     to: datetime = Query(..., alias="to"),
 ):
-    if to <= from_:
-        raise HTTPException(status_code=422, detail="'to' must be after 'from'")
+    _check_window(from_, to)
+    with get_session() as session:
+        return cached_free_slots(session, from_, to)
+
+@router.get("/blocks", response_model=list[SlotRead], dependencies=[Depends(admit("blocks"))])
+def get_free_blocks(
+    from_: datetime = Query(..., alias="from"),
+    to: datetime = Query(..., alias="to"),
+    duration: int = Query(..., ge=1, le=24 * 60, description="Block length in minutes"),
+    step: Optional[int] = Query(None, ge=1, le=24 * 60, description="Start alignment in minutes"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Start times where `duration` contiguous free minutes are available."""
+    _check_window(from_, to)
+    with get_session() as session:
+        return list_free_blocks(session, from_, to, duration, step, limit)
+
+# ---------- Waitlist ----------
+@router.post(
+    "/waitlist", response_model=WaitlistRead, status_code=201,
+    dependencies=[Depends(admit("waitlist"))],
+)
+def join_waitlist_api(payload: WaitlistCreate):
+    """Register interest; a slot freed inside the range is held for the earliest waiter."""
+    with get_session() as session:
+        return waitlist.join_waitlist(session, payload)
+
+@router.get(
+    "/waitlist/{entry_id}", response_model=WaitlistRead,
+    dependencies=[Depends(admit("waitlist"))],
+)
+def get_waitlist_entry(entry_id: str):
+    """Entry status plus the latest offer (slot and expiry), if any."""
+    with get_session() as session:
+        return waitlist.get_entry(session, entry_id)
+
+@router.post(
+    "/waitlist/{entry_id}/accept", response_model=AppointmentRead, status_code=201,
+    dependencies=[Depends(admit("waitlist"))],
+)
+def accept_waitlist_offer(entry_id: str):
+    """Book the held slot before the offer expires."""
     with get_session() as session:
-        return list_free_slots(session, from_, to)
+        return waitlist.accept_offer(session, entry_id)
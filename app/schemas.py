@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator
 
@@ -50,4 +50,54 @@ class AppointmentStatusUpdate(BaseModel):
 
 class SlotRead(BaseModel):
     start_at: datetime
-    end_at: datetime
\ No newline at end of file
+    end_at: datetime
+# ---------- Delta sync ----------
+class ChangesRead(BaseModel):
+    token: int = Field(description="Pass back as ?since= on the next sync")
+    full: bool = Field(description="True if this is a full snapshot rather than a delta")
+    appointments: list[AppointmentRead]
+    availabilities: list[AvailabilityRead]
+    deleted_appointments: list[str]
+    deleted_availabilities: list[str]
+
+# ---------- Analytics ----------
+class AnalyticsRow(BaseModel):
+    period_start: date
+    available_minutes: int
+    booked_minutes: int
+    utilization: Optional[float] = Field(description="booked / available minutes")
+    scheduled: int
+    completed: int
+    no_show: int
+    canceled: int
+    no_show_rate: Optional[float] = Field(description="no_show / (completed + no_show)")
+
+# ---------- Waitlist ----------
+class WaitlistCreate(BaseModel):
+    patient_name: str
+    note: Optional[str] = None
+    range_start: datetime
+    range_end: datetime
+
+    @field_validator("range_end")
+    @classmethod
+    def _end_after_start(cls, v, info):
+        start = info.data.get("range_start")
+        if start is not None and v <= start:
+            raise ValueError("range_end must be after range_start")
+        return v
+
+class SlotOfferRead(BaseModel):
+    id: str
+    start_at: datetime
+    end_at: datetime
+    expires_at: datetime
+    status: Literal["pending", "accepted", "expired"]
+
+class WaitlistRead(BaseModel):
+    id: str
+    patient_name: str
+    range_start: datetime
+    range_end: datetime
+    status: Literal["waiting", "offered", "booked", "lapsed", "expired"]
+    offer: Optional[SlotOfferRead] = None
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import List, Optional, Union, Any, Dict
+from typing import List, Optional, Union, Any, Dict, Tuple
 
 from fastapi import HTTPException
 from sqlmodel import select
 
-from app.model import Appointment, DailyAvailability, Doctor
+from app.db import record_change
+from app.model import Appointment, DailyAvailability, Doctor, SlotOffer, _utcnow_naive
+from app.services import idempotency, waitlist
+from app.services.stats import apply_appointment
 from app.schemas import AppointmentCreate, AppointmentRead, AppointmentStatusUpdate
 
 
@@ -24,12 +27,19 @@ def _get_single_doctor_id(session) -> str:
     return doc.id
 
 
-def create_appointment(session, payload: AppointmentCreate) -> AppointmentRead:
+def create_appointment(
+    session,
+    payload: AppointmentCreate,
+    idempotency_key: Optional[Tuple[str, str]] = None,
+    held_for: Optional[str] = None,
+) -> AppointmentRead:
     """
     Public: create an appointment if:
       - inside an active availability window
       - no conflicting 'scheduled' appointment exists
+      - not held by a pending waitlist offer (except `held_for`, the offer being accepted)
     All datetimes are stored as UTC-naive.
+    `idempotency_key` is (key, request_hash); the response is stored in the same transaction.
     """
     start_at = _to_utc_naive(payload.start_at)
     end_at = _to_utc_naive(payload.end_at)
@@ -63,6 +73,19 @@ def create_appointment(session, payload: AppointmentCreate) -> AppointmentRead:
     if conflict:
         raise HTTPException(status_code=409, detail="Slot already booked")
 
+    # Held for a waitlist patient
+    hold = session.exec(
+        select(SlotOffer.id).where(
+            SlotOffer.status == "pending",
+            SlotOffer.expires_at > _utcnow_naive(),
+            SlotOffer.id != held_for,
+            SlotOffer.start_at < end_at,
+            SlotOffer.end_at > start_at,
+        )
+    ).first()
+    if hold:
+        raise HTTPException(status_code=409, detail="Slot reserved for waitlist")
+
     appt = Appointment(
         doctor_id=doctor_id,
         start_at=start_at,
@@ -72,7 +95,14 @@ def create_appointment(session, payload: AppointmentCreate) -> AppointmentRead:
         status="scheduled",
     )
     session.add(appt)
+    apply_appointment(session, appt)
+    record_change(session, "appointment", appt.id)
+    if idempotency_key:
+        body = AppointmentRead.model_validate(appt, from_attributes=True).model_dump(mode="json")
+        idempotency.remember(session, *idempotency_key, body)
     session.commit()
+    if idempotency_key:
+        idempotency.fill_cache(*idempotency_key, body)
     session.refresh(appt)
     return appt
 
@@ -112,8 +142,18 @@ def update_status(session, appointment_id: str, status: Union[str, AppointmentSt
     if not appt:
         raise HTTPException(status_code=404, detail="Appointment not found")
 
+    freed = appt.status == "scheduled" and new_status == "canceled"
+    if new_status != appt.status:
+        apply_appointment(session, appt, -1)
+        apply_appointment(session, appt, 1, new_status)
     appt.status = new_status
+    appt.updated_at = _utcnow_naive()
     session.add(appt)
+    record_change(session, "appointment", appt.id)
+    if freed:
+        waitlist.record_freed_slot(session, appt)
     session.commit()
     session.refresh(appt)
+    if freed:
+        waitlist.worker.notify()
     return appt
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+
+from sqlmodel import select
+
+from app.cache import VersionedCache
+from app.model import Appointment, CalendarVersion, DailyAvailability, Doctor, _utcnow_naive
+
+# Rendered feeds per (doctor, range), invalidated by the calendar version
+_feed_cache = VersionedCache(maxsize=64)
+
+_STATUS = {"scheduled": "CONFIRMED", "completed": "CONFIRMED", "no_show": "CONFIRMED", "canceled": "CANCELLED"}
+
+
+def _ics_dt(dt: datetime) -> str:
+    """UTC-naive datetime -> iCalendar UTC form (YYYYMMDDTHHMMSSZ)."""
+    return dt.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold content lines at 75 octets as required by RFC 5545."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for ch in line:
+        b = ch.encode("utf-8")
+        if len(chunk) + len(b) > (75 if not parts else 74):
+            parts.append(chunk.decode("utf-8"))
+            chunk = b""
+        chunk += b
+    parts.append(chunk.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def iter_feed_lines(session, doctor: Doctor, range_start: datetime, range_end: datetime) -> Iterator[str]:
+    """
+    Yield folded iCalendar lines for appointments and active availabilities
+    intersecting [range_start, range_end). Datetimes are UTC-naive.
+    """
+    yield _fold("BEGIN:VCALENDAR")
+    yield _fold("VERSION:2.0")
+    yield _fold("PRODID:-//Clinic SaaS MVP//Doctor calendar//EN")
+    yield _fold("CALSCALE:GREGORIAN")
+    yield _fold(f"X-WR-CALNAME:{_escape(doctor.name)}")
+    yield _fold(f"X-WR-TIMEZONE:{doctor.timezone}")
+
+    appts = session.exec(
+        select(Appointment)
+        .where(Appointment.doctor_id == doctor.id)
+        .where(Appointment.start_at < range_end)
+        .where(Appointment.end_at > range_start)
+        .order_by(Appointment.start_at)
+    )
+    for a in appts:
+        yield _fold("BEGIN:VEVENT")
+        yield _fold(f"UID:appt-{a.id}@clinic-saas")
+        yield _fold(f"DTSTAMP:{_ics_dt(a.updated_at)}")
+        yield _fold(f"LAST-MODIFIED:{_ics_dt(a.updated_at)}")
+        yield _fold(f"DTSTART:{_ics_dt(a.start_at)}")
+        yield _fold(f"DTEND:{_ics_dt(a.end_at)}")
+        yield _fold(f"SUMMARY:{_escape(a.patient_name)}")
+        if a.note:
+            yield _fold(f"DESCRIPTION:{_escape(a.note)}")
+        yield _fold(f"STATUS:{_STATUS.get(a.status, 'CONFIRMED')}")
+        yield _fold(f"CATEGORIES:{a.status}")
+        yield _fold("END:VEVENT")
+
+    # Availabilities carry no timestamps; the calendar's last revision bounds theirs
+    state = session.get(CalendarVersion, 1)
+    avail_stamp = _ics_dt(state.updated_at if state else _utcnow_naive())
+    avails = session.exec(
+        select(DailyAvailability)
+        .where(DailyAvailability.doctor_id == doctor.id)
+        .where(DailyAvailability.is_active == True)  # noqa: E712
+        .where(DailyAvailability.start_at < range_end)
+        .where(DailyAvailability.end_at > range_start)
+        .order_by(DailyAvailability.start_at)
+    )
+    for av in avails:
+        yield _fold("BEGIN:VEVENT")
+        yield _fold(f"UID:avail-{av.id}@clinic-saas")
+        yield _fold(f"DTSTAMP:{avail_stamp}")
+        yield _fold(f"DTSTART:{_ics_dt(av.start_at)}")
+        yield _fold(f"DTEND:{_ics_dt(av.end_at)}")
+        yield _fold("SUMMARY:Available")
+        yield _fold("TRANSP:TRANSPARENT")
+        yield _fold("END:VEVENT")
+
+    yield _fold("END:VCALENDAR")
+
+
+def feed_validators(session, range_start: datetime, range_end: datetime) -> Tuple[int, str, Optional[datetime]]:
+    """
+    Return (version, etag, last_modified) from the CalendarVersion row alone,
+    so conditional polls can be answered without reading appointments.
+    last_modified is None while the current second is still the second of the
+    last change: a later change in that same second would otherwise carry the
+    same one-second HTTP-date, and an If-Modified-Since poll would get a stale 304.
+    """
+    state = session.get(CalendarVersion, 1)
+    version = state.version if state else 0
+    changed = (state.updated_at if state else datetime(1970, 1, 1)).replace(microsecond=0)
+    now = _utcnow_naive().replace(microsecond=0)
+    last_modified = changed if changed < now else None
+    etag = f'"{version}-{_ics_dt(range_start)}-{_ics_dt(range_end)}"'
+    return version, etag, last_modified
+
+
+def render_feed(session, doctor: Doctor, range_start: datetime, range_end: datetime, version: int) -> bytes:
+    """The feed body, rendered once per calendar version and range, then served from cache."""
+    return _feed_cache.get_or_compute(
+        (doctor.id, range_start, range_end), version,
+        lambda: "".join(iter_feed_lines(session, doctor, range_start, range_end)).encode("utf-8"),
+    )
+
+
+def http_date(dt: datetime) -> str:
+    """UTC-naive datetime -> RFC 7231 HTTP-date."""
+    return format_datetime(dt.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def is_not_modified(etag: str, last_modified: Optional[datetime],
+                    if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """
+    Evaluate conditional GET headers; If-None-Match wins over If-Modified-Since.
+    The ETag is exact; If-Modified-Since is ignored while last_modified is unstable (None).
+    """
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return last_modified <= since
+    return False
+
+
+def default_range(now: datetime) -> Tuple[datetime, datetime]:
+    """Default feed window: 30 days back, 90 days ahead (UTC-naive)."""
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=30), day + timedelta(days=90)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete
+
+from app.cache import TTLCache
+from app.config import settings
+from app.model import IdempotencyKey, _utcnow_naive
+
+MAX_KEY_LENGTH = 255
+
+# Hot replays are answered from memory; the table covers restarts and other workers
+_replay_cache = TTLCache(maxsize=settings.IDEMPOTENCY_CACHE_SIZE, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+def request_hash(payload) -> str:
+    """Stable fingerprint of a request body (pydantic model)."""
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=422, detail="Invalid Idempotency-Key")
+    return key
+
+
+def lookup(session, key: str, req_hash: str) -> Optional[Tuple[int, dict]]:
+    """
+    Return (status_code, body) stored for `key`, or None if unseen/expired.
+    Reusing a key with a different request body is rejected with 422.
+    """
+    hit = _replay_cache.get(key)
+    if hit is None:
+        row = session.get(IdempotencyKey, key)
+        if row is None:
+            return None
+        # Keep memory and table in agreement: cache only for the row's remaining lifetime
+        remaining = (
+            row.created_at + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS) - _utcnow_naive()
+        ).total_seconds()
+        if remaining <= 0:
+            return None
+        hit = (row.request_hash, row.status_code, json.loads(row.response_json))
+        _replay_cache.set(key, hit, ttl=remaining)
+
+    stored_hash, status_code, body = hit
+    if stored_hash != req_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key reused with a different request")
+    return status_code, body
+
+
+def remember(session, key: str, req_hash: str, body: dict, status_code: int = 201) -> None:
+    """
+    Stage the key row in the caller's transaction (commit makes it durable together
+    with the booking) and prune expired keys. Call fill_cache() after the commit.
+    """
+    ttl = timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+    session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < _utcnow_naive() - ttl))
+    session.add(IdempotencyKey(
+        key=key, request_hash=req_hash, status_code=status_code, response_json=json.dumps(body),
+    ))
+
+
+def fill_cache(key: str, req_hash: str, body: dict, status_code: int = 201) -> None:
+    _replay_cache.set(key, (req_hash, status_code, body))
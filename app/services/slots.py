@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import List
+from typing import List, Optional, Tuple
 
 from sqlmodel import select
+from app.cache import VersionedCache
+from app.db import get_calendar_version
+from app.services.waitlist import held_intervals
 from app.model import DailyAvailability, Appointment
 from app.schemas import SlotRead
 from app.config import settings
 
+# Per-worker cache of computed grids, invalidated by the shared calendar version
+_slot_cache = VersionedCache(maxsize=256)
 
 
 def _to_utc_naive(dt: datetime) -> datetime:
@@ -30,7 +35,7 @@ def list_free_slots(session, window_start: datetime, window_end: datetime) -> Li
     """
     Enumerate free slots within [window_start, window_end) on a grid of BOOKING_SLOT_MINUTES.
     - Only consider is_active=True availabilities that intersect the window
-    - Block only 'scheduled' appointments
+    - Block only 'scheduled' appointments and slots held for the waitlist
     - All comparisons are UTC-naive
     """
     ws = _to_utc_naive(window_start)
@@ -52,9 +57,9 @@ def list_free_slots(session, window_start: datetime, window_end: datetime) -> Li
         )
     ).all()
 
-    for appt in booked:
-        appt.start_at = _to_utc_naive(appt.start_at)
-        appt.end_at = _to_utc_naive(appt.end_at)
+    busy = [(_to_utc_naive(a.start_at), _to_utc_naive(a.end_at)) for a in booked]
+    # Slots held for waitlist patients are not offered publicly
+    busy += held_intervals(session, ws, we)
 
     slots: List[SlotRead] = []
     step = timedelta(minutes=settings.BOOKING_SLOT_MINUTES)
@@ -79,8 +84,8 @@ def list_free_slots(session, window_start: datetime, window_end: datetime) -> Li
 
             # Overlap with scheduled?
             overlap = False
-            for appt in booked:
-                if not (slot_end <= appt.start_at or slot_start >= appt.end_at):
+            for b_start, b_end in busy:
+                if not (slot_end <= b_start or slot_start >= b_end):
                     overlap = True
                     break
 
@@ -90,3 +95,124 @@ def list_free_slots(session, window_start: datetime, window_end: datetime) -> Li
             slot_start += step
 
     return slots
+
+
+
+def cached_free_slots(session, window_start: datetime, window_end: datetime) -> List[SlotRead]:
+    """
+    list_free_slots() behind the per-worker VersionedCache.
+    The calendar version is read before the slot queries, so a cached grid can
+    only be newer than its tag, never older. Slots that have started since the
+    grid was computed are dropped on the way out.
+    """
+    ws = _to_utc_naive(window_start)
+    we = _to_utc_naive(window_end)
+    version = get_calendar_version(session)
+    slots = _slot_cache.get_or_compute(
+        (ws, we, settings.BOOKING_SLOT_MINUTES), version,
+        lambda: list_free_slots(session, ws, we),
+    )
+    now_naive = _to_utc_naive(datetime.now(timezone.utc))
+    return [s for s in slots if s.start_at >= now_naive]
+
+def _merge_busy(busy: List[tuple]) -> List[tuple]:
+    """Merge overlapping (start, end) intervals; input sorted by start, output sorted by start and end."""
+    merged: List[tuple] = []
+    for b_start, b_end in busy:
+        if merged and b_start <= merged[-1][1]:
+            if b_end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], b_end)
+        else:
+            merged.append((b_start, b_end))
+    return merged
+
+
+def _free_gaps(start: datetime, end: datetime, busy: List[tuple], i: int = 0) -> Tuple[List[tuple], int]:
+    """
+    Subtract merged busy intervals from [start, end) and return (gaps, cursor).
+    Scanning starts at busy[i]; the returned cursor is where the next (later)
+    range should resume, so walking sorted ranges is a single merge pass.
+    """
+    while i < len(busy) and busy[i][1] <= start:
+        i += 1
+    gaps = []
+    cursor = start
+    while i < len(busy) and busy[i][0] < end:
+        b_start, b_end = busy[i]
+        if b_start > cursor:
+            gaps.append((cursor, b_start))
+        cursor = max(cursor, b_end)
+        if b_end > end:
+            break  # may also cover the next range; do not step past it
+        i += 1
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps, i
+
+
+def list_free_blocks(
+    session,
+    window_start: datetime,
+    window_end: datetime,
+    duration_minutes: int,
+    step_minutes: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[SlotRead]:
+    """
+    Find start times where a contiguous free block of `duration_minutes` exists.
+    - Candidates are aligned to `step_minutes` from the availability start
+      (defaults to BOOKING_SLOT_MINUTES, same grid as list_free_slots)
+    - Busy intervals are merged once; free gaps come from a single merge pass
+      over sorted availabilities and busy intervals, then are walked by step
+    - Results are ordered by start_at and truncated to `limit`
+    """
+    ws = _to_utc_naive(window_start)
+    we = _to_utc_naive(window_end)
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=step_minutes or settings.BOOKING_SLOT_MINUTES)
+
+    avails = session.exec(
+        select(DailyAvailability)
+        .where(
+            DailyAvailability.is_active == True,  # noqa: E712
+            DailyAvailability.end_at >= ws,
+            DailyAvailability.start_at <= we,
+        )
+        .order_by(DailyAvailability.start_at)
+    ).all()
+
+    booked = session.exec(
+        select(Appointment.start_at, Appointment.end_at)
+        .where(
+            Appointment.status == "scheduled",
+            Appointment.start_at < we,
+            Appointment.end_at > ws,
+        )
+        .order_by(Appointment.start_at)
+    ).all()
+    busy = _merge_busy(sorted(
+        [(_to_utc_naive(s), _to_utc_naive(e)) for s, e in booked] + held_intervals(session, ws, we)
+    ))
+    cursor = 0
+
+    blocks: List[SlotRead] = []
+    now_naive = _to_utc_naive(datetime.now(timezone.utc))
+    for av in avails:
+        av_start = _to_utc_naive(av.start_at)
+        start = max(av_start, ws, now_naive)
+        end = min(_to_utc_naive(av.end_at), we)
+        if start + duration > end:
+            continue
+
+        gaps, cursor = _free_gaps(start, end, busy, cursor)
+        for gap_start, gap_end in gaps:
+            # Round up to the next grid point measured from the availability start
+            offset = (gap_start - av_start) % step
+            cand = gap_start if not offset else gap_start + (step - offset)
+            while cand + duration <= gap_end:
+                blocks.append(SlotRead(start_at=cand, end_at=cand + duration))
+                if limit is not None and len(blocks) >= limit:
+                    return blocks
+                cand += step
+
+    return blocks
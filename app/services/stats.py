@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import select
+
+from app.model import Appointment, DailyAvailability, DailyStats
+from app.schemas import AnalyticsRow
+
+_COUNTERS = ("available_minutes", "booked_minutes", "scheduled_count",
+             "completed_count", "no_show_count", "canceled_count")
+
+
+def _minutes_by_day(start: datetime, end: datetime) -> Dict[date, int]:
+    """Split [start, end) into whole minutes per UTC day."""
+    out: Dict[date, int] = {}
+    cursor = start
+    while cursor < end:
+        next_midnight = datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time())
+        stop = min(end, next_midnight)
+        out[cursor.date()] = out.get(cursor.date(), 0) + int((stop - cursor).total_seconds() // 60)
+        cursor = stop
+    return out
+
+
+def _bump(session, doctor_id: str, day: date, **deltas: int) -> None:
+    """Atomically add `deltas` to one DailyStats row (upsert, no read-modify-write)."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    stmt = insert(DailyStats).values(doctor_id=doctor_id, day=day, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["doctor_id", "day"],
+        set_={k: getattr(DailyStats, k) + v for k, v in deltas.items()},
+    )
+    session.execute(stmt)
+
+
+def apply_availability(session, av: DailyAvailability, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) an availability's minutes from the aggregates."""
+    if not av.is_active:
+        return
+    for day, minutes in _minutes_by_day(av.start_at, av.end_at).items():
+        _bump(session, av.doctor_id, day, available_minutes=sign * minutes)
+
+
+def apply_appointment(session, appt: Appointment, sign: int = 1, status: Optional[str] = None) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) an appointment's contribution.
+    `status` overrides appt.status, e.g. to remove the pre-update contribution.
+    Counts go to the start day; booked minutes are split per day.
+    """
+    status = status or appt.status
+    _bump(session, appt.doctor_id, appt.start_at.date(), **{f"{status}_count": sign})
+    if status != "canceled":
+        for day, minutes in _minutes_by_day(appt.start_at, appt.end_at).items():
+            _bump(session, appt.doctor_id, day, booked_minutes=sign * minutes)
+
+
+def rebuild_daily_stats(session) -> None:
+    """Recompute all aggregates from scratch (bootstrap for pre-existing data)."""
+    session.execute(delete(DailyStats))
+    for av in session.exec(select(DailyAvailability)).all():
+        apply_availability(session, av)
+    for appt in session.exec(select(Appointment)).all():
+        apply_appointment(session, appt)
+
+
+def summarize(session, doctor_id: str, day_from: date, day_to: date, group: str = "day") -> List[AnalyticsRow]:
+    """
+    Aggregate DailyStats over [day_from, day_to] by day or ISO week (Monday start).
+    Reads at most one row per day in range; no appointment/availability scan.
+    """
+    rows = session.exec(
+        select(DailyStats)
+        .where(DailyStats.doctor_id == doctor_id)
+        .where(DailyStats.day >= day_from, DailyStats.day <= day_to)
+        .order_by(DailyStats.day)
+    ).all()
+
+    buckets: Dict[date, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    for r in rows:
+        key = r.day if group == "day" else r.day - timedelta(days=r.day.weekday())
+        for c in _COUNTERS:
+            buckets[key][c] += getattr(r, c)
+
+    out: List[AnalyticsRow] = []
+    for period, b in sorted(buckets.items()):
+        attended = b["completed_count"] + b["no_show_count"]
+        out.append(AnalyticsRow(
+            period_start=period,
+            available_minutes=b["available_minutes"],
+            booked_minutes=b["booked_minutes"],
+            utilization=(b["booked_minutes"] / b["available_minutes"]) if b["available_minutes"] else None,
+            scheduled=b["scheduled_count"],
+            completed=b["completed_count"],
+            no_show=b["no_show_count"],
+            canceled=b["canceled_count"],
+            no_show_rate=(b["no_show_count"] / attended) if attended else None,
+        ))
+    return out
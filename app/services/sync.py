@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from app.model import Appointment, ChangeLog, DailyAvailability
+from app.schemas import AppointmentRead, AvailabilityRead, ChangesRead
+
+_ENTITIES = {"appointment": Appointment, "availability": DailyAvailability}
+
+
+def _read(schema, rows) -> list:
+    return [schema.model_validate(r, from_attributes=True) for r in rows]
+
+
+def current_token(session) -> int:
+    """Highest ChangeLog sequence number (0 when nothing has changed yet)."""
+    return session.exec(select(func.max(ChangeLog.seq))).one() or 0
+
+
+def changes_since(session, doctor_id: str, since: Optional[int] = None) -> ChangesRead:
+    """
+    Doctor: rows created/modified/deleted after `since`.
+    - since=None/0 returns a full snapshot (rows that predate the ChangeLog included)
+    - otherwise only entities touched by ChangeLog entries with seq > since are read;
+      the last op per entity wins, deletes come back as tombstone ids
+    - The returned token is read first, so changes racing with this call are
+      re-delivered on the next sync rather than lost
+    """
+    token = current_token(session)
+
+    if not since:
+        appts = session.exec(
+            select(Appointment).where(Appointment.doctor_id == doctor_id).order_by(Appointment.start_at)
+        ).all()
+        avails = session.exec(
+            select(DailyAvailability)
+            .where(DailyAvailability.doctor_id == doctor_id)
+            .order_by(DailyAvailability.start_at)
+        ).all()
+        return ChangesRead(
+            token=token, full=True,
+            appointments=_read(AppointmentRead, appts),
+            availabilities=_read(AvailabilityRead, avails),
+            deleted_appointments=[], deleted_availabilities=[],
+        )
+
+    entries = session.exec(
+        select(ChangeLog)
+        .where(ChangeLog.seq > since, ChangeLog.seq <= token)
+        .order_by(ChangeLog.seq)
+    ).all()
+    last_op: Dict[str, Dict[str, str]] = {name: {} for name in _ENTITIES}
+    for entry in entries:
+        last_op[entry.entity][entry.entity_id] = entry.op
+
+    upserted = {}
+    deleted = {}
+    for name, model in _ENTITIES.items():
+        ids = [i for i, op in last_op[name].items() if op != "delete"]
+        deleted[name] = sorted(i for i, op in last_op[name].items() if op == "delete")
+        upserted[name] = session.exec(
+            select(model)
+            .where(model.id.in_(ids), model.doctor_id == doctor_id)
+            .order_by(model.start_at)
+        ).all() if ids else []
+
+    return ChangesRead(
+        token=token, full=False,
+        appointments=_read(AppointmentRead, upserted["appointment"]),
+        availabilities=_read(AvailabilityRead, upserted["availability"]),
+        deleted_appointments=deleted["appointment"],
+        deleted_availabilities=deleted["availability"],
+    )
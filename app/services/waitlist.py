@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.db import bump_calendar_version, engine
+from app.model import Appointment, DailyAvailability, Doctor, FreedSlot, SlotOffer, WaitlistEntry, _utcnow_naive
+from app.schemas import AppointmentCreate, AppointmentRead, SlotOfferRead, WaitlistCreate, WaitlistRead
+
+logger = logging.getLogger("app.waitlist")
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    """Normalize to UTC-naive (tzinfo=None) for consistent storage and comparison."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def held_intervals(session, window_start: datetime, window_end: datetime) -> List[Tuple[datetime, datetime]]:
+    """(start, end) of unexpired pending offers overlapping the window; these block public booking."""
+    rows = session.exec(
+        select(SlotOffer.start_at, SlotOffer.end_at).where(
+            SlotOffer.status == "pending",
+            SlotOffer.expires_at > _utcnow_naive(),
+            SlotOffer.start_at < window_end,
+            SlotOffer.end_at > window_start,
+        )
+    ).all()
+    return [(s, e) for s, e in rows]
+
+
+# ---------------------------------------------------------------------------
+# Registration / lookup
+# ---------------------------------------------------------------------------
+
+def join_waitlist(session, payload: WaitlistCreate) -> WaitlistRead:
+    """Public: register interest in any slot freed inside the given range."""
+    start = _to_utc_naive(payload.range_start)
+    end = _to_utc_naive(payload.range_end)
+    if end <= _utcnow_naive():
+        raise HTTPException(status_code=400, detail="Waitlist range must end in the future")
+    doctor = session.exec(select(Doctor)).first()
+    if not doctor:
+        raise HTTPException(500, "Doctor not initialized")
+
+    entry = WaitlistEntry(
+        doctor_id=doctor.id, patient_name=payload.patient_name, note=payload.note,
+        range_start=start, range_end=end,
+    )
+    session.add(entry)
+    session.commit()
+    session.refresh(entry)
+    return get_entry(session, entry.id)
+
+
+def get_entry(session, entry_id: str) -> WaitlistRead:
+    entry = session.get(WaitlistEntry, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Waitlist entry not found")
+    offer = session.exec(
+        select(SlotOffer).where(SlotOffer.waitlist_id == entry.id).order_by(SlotOffer.created_at.desc())
+    ).first()
+    return WaitlistRead(
+        id=entry.id, patient_name=entry.patient_name,
+        range_start=entry.range_start, range_end=entry.range_end, status=entry.status,
+        offer=SlotOfferRead.model_validate(offer, from_attributes=True) if offer else None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Matching / expiry (run by the background worker)
+# ---------------------------------------------------------------------------
+
+def offer_freed_slot(session, start_at: datetime, end_at: datetime) -> Optional[SlotOffer]:
+    """
+    Hold [start_at, end_at) for the oldest waiting entry whose range covers it.
+    Skips slots that are in the past, outside active availability, or already taken again.
+    Staged in the caller's transaction; the caller commits.
+    """
+    now = _utcnow_naive()
+    if start_at <= now:
+        return None
+
+    taken = session.exec(
+        select(Appointment.id).where(
+            Appointment.status == "scheduled",
+            Appointment.start_at < end_at,
+            Appointment.end_at > start_at,
+        )
+    ).first()
+    if taken or held_intervals(session, start_at, end_at):
+        return None
+    available = session.exec(
+        select(DailyAvailability.doctor_id).where(
+            DailyAvailability.is_active == True,  # noqa: E712
+            DailyAvailability.start_at <= start_at,
+            DailyAvailability.end_at >= end_at,
+        )
+    ).first()
+    if not available:
+        return None
+
+    # ix_waitlist_range bounds the scan by range_start and checks range_end in the
+    # index; only covering candidates reach the created_at sort
+    entry = session.exec(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.doctor_id == available,
+            WaitlistEntry.status == "waiting",
+            WaitlistEntry.range_start <= start_at,
+            WaitlistEntry.range_end >= end_at,
+        )
+        .order_by(WaitlistEntry.created_at)
+    ).first()
+    if not entry:
+        return None
+
+    offer = SlotOffer(
+        waitlist_id=entry.id, doctor_id=entry.doctor_id,
+        start_at=start_at, end_at=end_at,
+        expires_at=now + timedelta(minutes=settings.WAITLIST_OFFER_MINUTES),
+    )
+    entry.status = "offered"
+    session.add(entry)
+    session.add(offer)
+    bump_calendar_version(session)  # the held slot disappears from public listings
+    return offer
+
+
+def record_freed_slot(session, appt: Appointment) -> None:
+    """Stage a FreedSlot outbox row in the cancel's own transaction, so no cancel is lost."""
+    session.add(FreedSlot(start_at=appt.start_at, end_at=appt.end_at))
+
+
+def process_freed_slots(session) -> int:
+    """
+    Drain the FreedSlot outbox, offering each slot to the next waiter.
+    Each row is claimed with a DELETE in the same transaction as its offer, so
+    several workers can drain concurrently and a crash leaves the row in place.
+    """
+    ids = session.exec(select(FreedSlot.id).order_by(FreedSlot.id)).all()
+    offered = 0
+    for slot_id in ids:
+        slot = session.get(FreedSlot, slot_id)
+        if slot is None:
+            continue
+        start_at, end_at = slot.start_at, slot.end_at
+        claimed = session.execute(delete(FreedSlot).where(FreedSlot.id == slot_id)).rowcount
+        if not claimed:
+            session.rollback()
+            continue
+        session.expunge(slot)
+        if offer_freed_slot(session, start_at, end_at):
+            offered += 1
+        session.commit()
+    return offered
+
+
+def retire_past_entries(session) -> int:
+    """Mark waiting entries whose range has ended as expired, keeping the match queue short."""
+    count = session.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.status == "waiting", WaitlistEntry.range_end <= _utcnow_naive())
+        .values(status="expired")
+    ).rowcount
+    session.commit()
+    return count
+
+
+def expire_offers(session) -> int:
+    """
+    Expire pending offers past their deadline, mark their entries lapsed and
+    re-offer each slot to the next waiter. Safe to run from several workers:
+    each offer is claimed with a conditional UPDATE.
+    """
+    now = _utcnow_naive()
+    expired = session.exec(
+        select(SlotOffer).where(SlotOffer.status == "pending", SlotOffer.expires_at <= now)
+    ).all()
+    count = 0
+    for offer in expired:
+        claimed = session.execute(
+            update(SlotOffer)
+            .where(SlotOffer.id == offer.id, SlotOffer.status == "pending")
+            .values(status="expired")
+        ).rowcount
+        if not claimed:
+            continue
+        session.execute(
+            update(WaitlistEntry)
+            .where(WaitlistEntry.id == offer.waitlist_id, WaitlistEntry.status == "offered")
+            .values(status="lapsed")
+        )
+        bump_calendar_version(session)
+        offer_freed_slot(session, offer.start_at, offer.end_at)
+        session.commit()
+        count += 1
+    return count
+
+
+def sweep(session) -> None:
+    """Periodic maintenance: retire past entries, expire offers, drain missed freed slots."""
+    retire_past_entries(session)
+    expire_offers(session)
+    process_freed_slots(session)
+
+
+def accept_offer(session, entry_id: str) -> AppointmentRead:
+    """Public: turn the entry's pending offer into a scheduled appointment."""
+    from app.services.appointments import create_appointment
+
+    entry = session.get(WaitlistEntry, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Waitlist entry not found")
+    offer = session.exec(
+        select(SlotOffer).where(SlotOffer.waitlist_id == entry.id, SlotOffer.status == "pending")
+    ).first()
+    if not offer or offer.expires_at <= _utcnow_naive():
+        raise HTTPException(status_code=409, detail="No active offer for this waitlist entry")
+
+    offer.status = "accepted"
+    entry.status = "booked"
+    session.add(offer)
+    session.add(entry)
+    # create_appointment commits the offer/entry changes together with the booking
+    return create_appointment(
+        session,
+        AppointmentCreate(
+            start_at=offer.start_at, end_at=offer.end_at,
+            patient_name=entry.patient_name, note=entry.note,
+        ),
+        held_for=offer.id,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Background worker
+# ---------------------------------------------------------------------------
+
+def _drain_in_new_session() -> None:
+    with Session(engine) as session:
+        process_freed_slots(session)
+
+
+def _sweep_in_new_session() -> None:
+    with Session(engine) as session:
+        sweep(session)
+
+
+class WaitlistWorker:
+    """
+    asyncio task that matches freed slots to waiters off the request path.
+    Cancels write a FreedSlot row in their own transaction and call notify()
+    from the threadpool as a wake-up hint; the worker drains the outbox in a
+    thread. The periodic sweep (every WAITLIST_SWEEP_SECONDS) also drains it,
+    so a lost wake-up only delays an offer.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()  # drain slots freed while no worker was running
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._loop = self._wakeup = self._task = None
+
+    def notify(self) -> None:
+        """Thread-safe; a no-op when the worker is not running (the sweep catches up)."""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(wakeup.set)
+
+    async def _run(self) -> None:
+        last_sweep = time.monotonic()
+        while True:
+            timeout = max(0.0, settings.WAITLIST_SWEEP_SECONDS - (time.monotonic() - last_sweep))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                woken = True
+            except asyncio.TimeoutError:
+                woken = False
+            self._wakeup.clear()
+            try:
+                if time.monotonic() - last_sweep >= settings.WAITLIST_SWEEP_SECONDS:
+                    last_sweep = time.monotonic()
+                    await asyncio.to_thread(_sweep_in_new_session)
+                elif woken:
+                    await asyncio.to_thread(_drain_in_new_session)
+            except Exception:
+                logger.exception("waitlist worker iteration failed")
+
+
+worker = WaitlistWorker()
@@ -0,0 +1,101 @@
+"""
+Payload size and server CPU for GET /api/doctor/appointments with 10k rows.
+
+    python benchmarks/bench_appointment_listing.py [--rows 10000] [--repeat 5]
+
+Runs against a throwaway SQLite file and drives the ASGI app directly, so the
+numbers are raw response bytes and server-side CPU (no HTTP client decoding).
+"""
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+TMPDIR = tempfile.mkdtemp(prefix="clinic_saas_bench_")
+os.environ["DATABASE_URL"] = f"sqlite:///{TMPDIR}/bench.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session  # noqa: E402
+
+from app.compression import brotli_available  # noqa: E402
+from app.db import engine, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.model import Appointment  # noqa: E402
+from app.services.appointments import _get_single_doctor_id  # noqa: E402
+
+AUTH = b"Basic " + base64.b64encode(b"doctor:change-me")
+
+
+def seed(rows: int) -> None:
+    init_db()
+    base = datetime(2030, 1, 1, 9, 0)
+    statuses = ["scheduled", "completed", "no_show", "canceled"]
+    with Session(engine) as session:
+        doctor_id = _get_single_doctor_id(session)
+        session.add_all(
+            Appointment(
+                doctor_id=doctor_id,
+                start_at=base + timedelta(minutes=30 * i),
+                end_at=base + timedelta(minutes=30 * (i + 1)),
+                patient_name=f"Patient {i}",
+                note="Follow-up regarding prescription and lab results. " * 3,
+                status=statuses[i % len(statuses)],
+            )
+            for i in range(rows)
+        )
+        session.commit()
+
+
+async def fetch(query: str, accept_encoding: str) -> tuple[int, bytes]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/doctor/appointments",
+        "raw_path": b"/api/doctor/appointments", "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        "headers": [(b"authorization", AUTH), (b"accept-encoding", accept_encoding.encode())],
+    }
+    chunks, status = [], 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    seed(args.rows)
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli_available() else [])
+    variants = [("all fields", ""), ("fields=id,start_at,status", "fields=id,start_at,status")]
+
+    print(f"rows={args.rows} repeat={args.repeat} brotli={'yes' if brotli_available() else 'no'}")
+    print(f"{'variant':<28}{'encoding':<10}{'bytes':>12}{'cpu ms':>10}")
+    for label, query in variants:
+        for enc in encodings:
+            asyncio.run(fetch(query, enc))  # warm-up
+            cpu = time.process_time()
+            for _ in range(args.repeat):
+                status, body = asyncio.run(fetch(query, enc))
+            cpu_ms = (time.process_time() - cpu) * 1000 / args.repeat
+            assert status == 200, status
+            print(f"{label:<28}{enc:<10}{len(body):>12,}{cpu_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,9 @@ from datetime import datetime, timezone, timedelta
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import SQLModel
-from app.db import init_db
 
 
-# アプリ読み込み
+# 環境変数は app.* の import より前に設定する（engine は import 時に DATABASE_URL を読む）
 os.environ.setdefault("BASIC_AUTH_USERNAME", "doctor")
 os.environ.setdefault("BASIC_AUTH_PASSWORD", "change-me")
 
@@ -60,6 +59,9 @@ def _reset_db_per_test():
     """
     # app.db 側に engine が定義されている前提
     from app.db import engine
+    from app.admission import controller
+
+    controller.reset()  # レート制限の状態もテストごとにリセット
 
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
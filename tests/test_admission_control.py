@@ -0,0 +1,65 @@
+import pytest
+from fastapi import HTTPException
+
+from app.admission import AdmissionController
+from app.config import settings
+
+def test_token_bucket_returns_429_with_retry_after(client, auth_header, day_window, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLIC_BURST", 3)
+    monkeypatch.setattr(settings, "PUBLIC_RATE_PER_SECOND", 0.1)
+    w_from, w_to = day_window
+    codes = [client.get(f"/api/public/slots?from={w_from}&to={w_to}").status_code for _ in range(4)]
+    assert codes == [200, 200, 200, 429]
+
+    r = client.get(f"/api/public/slots?from={w_from}&to={w_to}")
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+
+    # Health is never shed; counters are visible to the doctor
+    assert client.get("/api/public/health").status_code == 200
+    m = client.get("/api/doctor/admission", headers=auth_header).json()
+    assert m["shed"]["slots:rate_limited"] == 2
+    assert m["admitted"]["slots"] == 3
+
+def test_waitlist_status_polls_are_rate_limited(client, monkeypatch):
+    monkeypatch.setattr(settings, "PUBLIC_BURST", 2)
+    monkeypatch.setattr(settings, "PUBLIC_RATE_PER_SECOND", 0.1)
+    codes = [client.get("/api/public/waitlist/unknown").status_code for _ in range(3)]
+    assert codes == [404, 404, 429]
+
+def test_concurrency_cap_sheds_with_503(monkeypatch):
+    monkeypatch.setattr(settings, "PUBLIC_MAX_CONCURRENCY", 1)
+    ctl = AdmissionController()
+    ctl.enter("a", "slots")
+    with pytest.raises(HTTPException) as exc:
+        ctl.enter("b", "slots")
+    assert exc.value.status_code == 503 and exc.value.headers["Retry-After"] == "1"
+    ctl.enter("b", "appointments")  # limit is per route
+    ctl.leave("slots")
+    ctl.enter("b", "slots")
+    assert ctl.snapshot()["shed"] == {"slots:overloaded": 1}
+
+def test_slot_window_span_is_capped(client):
+    r = client.get("/api/public/slots?from=2030-01-01T00:00:00Z&to=2030-06-01T00:00:00Z")
+    assert r.status_code == 422
+    r = client.get("/api/public/blocks?from=2030-01-01T00:00:00Z&to=2030-06-01T00:00:00Z&duration=60")
+    assert r.status_code == 422
+
+def test_503_does_not_drain_client_bucket(monkeypatch):
+    monkeypatch.setattr(settings, "PUBLIC_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "PUBLIC_BURST", 2)
+    monkeypatch.setattr(settings, "PUBLIC_RATE_PER_SECOND", 0.0)
+    ctl = AdmissionController()
+    ctl.enter("other", "slots")  # fills the route
+    ctl.enter("a", "appointments")
+    ctl.leave("appointments")
+    tokens_before = ctl._buckets["a"].tokens
+    for _ in range(3):
+        with pytest.raises(HTTPException) as exc:
+            ctl.enter("a", "slots")
+        assert exc.value.status_code == 503
+    assert ctl._buckets["a"].tokens == tokens_before
+
+    # After the route frees up, the client's remaining token still admits it
+    ctl.leave("slots")
+    ctl.enter("a", "slots")
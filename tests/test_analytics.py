@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.model import DailyStats
+from app.services.stats import rebuild_daily_stats
+from conftest import iso
+
+def _snapshot():
+    with Session(engine) as session:
+        return sorted(
+            (r.day, r.available_minutes, r.booked_minutes, r.scheduled_count,
+             r.completed_count, r.no_show_count, r.canceled_count)
+            for r in session.exec(select(DailyStats)).all()
+        )
+
+def test_analytics_incremental_matches_rebuild(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    r = client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    avail = r.json()
+    base = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    ids = []
+    for offset in (0, 30, 60):
+        rb = client.post("/api/public/appointments", json={
+            "start_at": iso(base + timedelta(minutes=offset)),
+            "end_at": iso(base + timedelta(minutes=offset + 30)),
+            "patient_name": f"P{offset}",
+        })
+        ids.append(rb.json()["id"])
+    client.patch(f"/api/doctor/appointments/{ids[0]}", headers=auth_header, json={"status": "completed"})
+    client.patch(f"/api/doctor/appointments/{ids[1]}", headers=auth_header, json={"status": "no_show"})
+    client.patch(f"/api/doctor/appointments/{ids[2]}", headers=auth_header, json={"status": "canceled"})
+    # Extend availability to 13:00
+    client.put(f"/api/doctor/availability/{avail['id']}", headers=auth_header, json={
+        "start_at": start, "end_at": iso(base + timedelta(hours=3)), "is_active": True
+    })
+
+    day = base.date().isoformat()
+    ra = client.get(f"/api/doctor/analytics?from={day}&to={day}", headers=auth_header)
+    assert ra.status_code == 200, ra.text
+    [row] = ra.json()
+    assert row["available_minutes"] == 180
+    assert row["booked_minutes"] == 60          # canceled does not count
+    assert (row["completed"], row["no_show"], row["canceled"], row["scheduled"]) == (1, 1, 1, 0)
+    assert row["no_show_rate"] == 0.5
+    assert abs(row["utilization"] - 60 / 180) < 1e-9
+
+    # Incremental maintenance agrees with a from-scratch rebuild
+    incremental = _snapshot()
+    with Session(engine) as session:
+        rebuild_daily_stats(session)
+        session.commit()
+    assert _snapshot() == incremental
+
+    # Weekly grouping rolls days up; deleting availability removes its minutes
+    rw = client.get(f"/api/doctor/analytics?from={day}&to={day}&group=week", headers=auth_header)
+    assert rw.json()[0]["booked_minutes"] == 60
+    client.delete(f"/api/doctor/availability/{avail['id']}", headers=auth_header)
+    row = client.get(f"/api/doctor/analytics?from={day}&to={day}", headers=auth_header).json()[0]
+    assert row["available_minutes"] == 0 and row["utilization"] is None
+
+def test_analytics_rejects_bad_group(client, auth_header):
+    r = client.get("/api/doctor/analytics?from=2030-01-01&to=2030-01-31&group=month", headers=auth_header)
+    assert r.status_code == 422
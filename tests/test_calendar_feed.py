@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from app.db import engine
+from app.model import CalendarVersion
+from app.services import ical
+
+def _backdate_last_change(seconds=5):
+    """Pretend the last calendar change happened a few seconds ago."""
+    with Session(engine) as session:
+        state = session.get(CalendarVersion, 1)
+        state.updated_at -= timedelta(seconds=seconds)
+        session.add(state)
+        session.commit()
+
+def test_ics_feed_and_conditional_get(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    client.post("/api/public/appointments", json={
+        "start_at": start, "end_at": start.replace("10:00", "10:30"),
+        "patient_name": "Doe, Jane", "note": "line1\nline2",
+    })
+
+    r = client.get("/api/doctor/calendar.ics", headers=auth_header)
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("text/calendar")
+    body = r.text
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and body.endswith("END:VCALENDAR\r\n")
+    assert body.count("BEGIN:VEVENT") == 2
+    assert "SUMMARY:Doe\\, Jane" in body and "DESCRIPTION:line1\\nline2" in body
+    etag = r.headers["etag"]
+
+    # Unchanged calendar -> 304 on either validator
+    r304 = client.get("/api/doctor/calendar.ics", headers={**auth_header, "If-None-Match": etag})
+    assert r304.status_code == 304 and r304.content == b""
+    _backdate_last_change()
+    last_modified = client.get("/api/doctor/calendar.ics", headers=auth_header).headers["last-modified"]
+    r304 = client.get("/api/doctor/calendar.ics", headers={**auth_header, "If-Modified-Since": last_modified})
+    assert r304.status_code == 304
+
+    # A new booking changes the version -> full response with a new ETag
+    client.post("/api/public/appointments", json={
+        "start_at": start.replace("10:00", "11:00"), "end_at": start.replace("10:00", "11:30"),
+        "patient_name": "B",
+    })
+    r2 = client.get("/api/doctor/calendar.ics", headers={**auth_header, "If-None-Match": etag})
+    assert r2.status_code == 200
+    assert r2.headers["etag"] != etag
+    assert r2.text.count("BEGIN:VEVENT") == 3
+
+def test_ics_feed_range_is_bounded(client, auth_header):
+    r = client.get("/api/doctor/calendar.ics?from=2025-01-01T00:00:00Z&to=2027-01-01T00:00:00Z", headers=auth_header)
+    assert r.status_code == 422
+    assert client.get("/api/doctor/calendar.ics").status_code == 401
+
+def test_ims_poll_sees_booking_made_right_after_it(client, auth_header, tomorrow_10_to_noon, monkeypatch):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    _backdate_last_change()
+    r = client.get("/api/doctor/calendar.ics", headers=auth_header)
+    last_modified = r.headers["last-modified"]
+
+    client.post("/api/public/appointments", json={
+        "start_at": start, "end_at": start.replace("10:00", "10:30"), "patient_name": "Right after",
+    })
+    # Pin the clock inside the second of that change, however slow this machine is
+    with Session(engine) as session:
+        changed_at = session.get(CalendarVersion, 1).updated_at
+    monkeypatch.setattr(ical, "_utcnow_naive", lambda: changed_at)
+    r2 = client.get("/api/doctor/calendar.ics", headers={**auth_header, "If-Modified-Since": last_modified})
+    assert r2.status_code == 200
+    assert "Right after" in r2.text
+    # Changed within the current second -> no Last-Modified offered, IMS not trusted
+    assert "last-modified" not in r2.headers
+
+def test_conditional_poll_does_not_render_feed(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    etag = client.get("/api/doctor/calendar.ics", headers=auth_header).headers["etag"]
+    ical._feed_cache.clear()  # cold cache, e.g. a fresh worker
+    r = client.get("/api/doctor/calendar.ics", headers={**auth_header, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert not ical._feed_cache._data  # nothing was rendered
+
+def test_availability_dtstamp_is_last_revision_not_start(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    with Session(engine) as session:
+        revised = ical._ics_dt(session.get(CalendarVersion, 1).updated_at)
+    body = client.get("/api/doctor/calendar.ics", headers=auth_header).text
+    event = body[body.index("UID:avail-"):]
+    assert f"DTSTAMP:{revised}" in event.split("END:VEVENT")[0]
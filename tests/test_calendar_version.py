@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app.db import engine, get_calendar_version, bump_calendar_version
+from app.model import Appointment
+from app.services.appointments import _get_single_doctor_id
+
+def _version():
+    with Session(engine) as session:
+        return get_calendar_version(session)
+
+def test_mutations_bump_calendar_version(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    v0 = _version()
+    r = client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    assert r.status_code == 201
+    v1 = _version()
+    assert v1 > v0
+
+    rb = client.post("/api/public/appointments", json={
+        "start_at": start, "end_at": start.replace("10:00", "10:30"), "patient_name": "A"
+    })
+    assert rb.status_code == 201
+    v2 = _version()
+    assert v2 > v1
+
+    client.patch(f"/api/doctor/appointments/{rb.json()['id']}", headers=auth_header, json={"status": "canceled"})
+    assert _version() > v2
+
+def test_slot_cache_sees_writes_from_other_workers(client, auth_header, tomorrow_10_to_noon, day_window):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    w_from, w_to = day_window
+    before = client.get(f"/api/public/slots?from={w_from}&to={w_to}").json()
+    assert len(before) == 4
+
+    # Simulate another worker process: write straight to the DB, bypassing this worker's cache
+    with Session(engine) as session:
+        s = datetime.fromisoformat(start.replace("Z", "+00:00")).replace(tzinfo=None)
+        session.add(Appointment(
+            doctor_id=_get_single_doctor_id(session),
+            start_at=s, end_at=s.replace(minute=30), patient_name="Other worker",
+        ))
+        bump_calendar_version(session)
+        session.commit()
+
+    after = client.get(f"/api/public/slots?from={w_from}&to={w_to}").json()
+    assert len(after) == 3
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+import time
+
+from sqlmodel import SQLModel
+
+from app import db
+
+# Generous budget for CI machines: import + init + first request in a fresh interpreter
+COLD_START_BUDGET_S = 5.0
+
+def test_init_db_skips_create_all_when_schema_stamp_matches(client, monkeypatch):
+    db.init_db()  # stamps PRAGMA user_version
+
+    def _boom(*a, **kw):
+        raise AssertionError("create_all must not run on the fast path")
+
+    monkeypatch.setattr(SQLModel.metadata, "create_all", _boom)
+    timings = db.init_db()
+    assert timings["schema_fast_path"] is True
+
+    monkeypatch.setattr(db.settings, "DB_STARTUP_MODE", "create")
+    monkeypatch.setattr(SQLModel.metadata, "create_all", lambda *a, **kw: None)
+    assert db.init_db()["schema_fast_path"] is False
+
+def test_startup_timings_are_reported(client):
+    timings = client.app.state.startup_timings
+    assert timings["import_ms"] > 0 and timings["init_db_ms"] >= 0
+
+def test_time_to_first_request_budget():
+    code = (
+        "from fastapi.testclient import TestClient\n"
+        "from app.main import app\n"
+        "with TestClient(app) as c:\n"
+        "    assert c.get('/api/public/health').status_code == 200\n"
+    )
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - t0
+    assert proc.returncode == 0, proc.stderr
+    assert elapsed < COLD_START_BUDGET_S
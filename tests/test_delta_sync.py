@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from conftest import iso
+
+def test_changes_since_returns_only_churn(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    r = client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    avail_id = r.json()["id"]
+    base = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    ids = []
+    for offset in (0, 30):
+        rb = client.post("/api/public/appointments", json={
+            "start_at": iso(base + timedelta(minutes=offset)),
+            "end_at": iso(base + timedelta(minutes=offset + 30)),
+            "patient_name": f"P{offset}",
+        })
+        ids.append(rb.json()["id"])
+
+    full = client.get("/api/doctor/changes", headers=auth_header)
+    assert full.status_code == 200, full.text
+    snap = full.json()
+    assert snap["full"] is True
+    assert len(snap["appointments"]) == 2 and len(snap["availabilities"]) == 1
+    token = snap["token"]
+
+    # Nothing changed -> empty delta, same token
+    empty = client.get(f"/api/doctor/changes?since={token}", headers=auth_header).json()
+    assert empty["full"] is False and empty["token"] == token
+    assert empty["appointments"] == [] and empty["availabilities"] == []
+
+    # One status change -> only that appointment comes back
+    client.patch(f"/api/doctor/appointments/{ids[0]}", headers=auth_header, json={"status": "canceled"})
+    delta = client.get(f"/api/doctor/changes?since={token}", headers=auth_header).json()
+    assert [a["id"] for a in delta["appointments"]] == [ids[0]]
+    assert delta["appointments"][0]["status"] == "canceled"
+    assert delta["token"] > token
+    token = delta["token"]
+
+    # A second availability created and deleted -> tombstone only
+    s2 = iso(base + timedelta(hours=3))
+    e2 = iso(base + timedelta(hours=4))
+    r2 = client.post("/api/doctor/availability", headers=auth_header, json={"start_at": s2, "end_at": e2})
+    client.delete(f"/api/doctor/availability/{r2.json()['id']}", headers=auth_header)
+    delta = client.get(f"/api/doctor/changes?since={token}", headers=auth_header).json()
+    assert delta["availabilities"] == []
+    assert delta["deleted_availabilities"] == [r2.json()["id"]]
+    assert avail_id not in delta["deleted_availabilities"]
+
+def test_changes_requires_auth(client):
+    assert client.get("/api/doctor/changes").status_code == 401
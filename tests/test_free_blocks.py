@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from conftest import iso
+
+def test_free_blocks_skip_gaps_too_short(client, auth_header, tomorrow_10_to_noon, day_window):
+    start, end = tomorrow_10_to_noon
+    r = client.post("/api/doctor/availability", headers=auth_header, json={
+        "start_at": start, "end_at": end, "is_active": True
+    })
+    assert r.status_code == 201, r.text
+    base = datetime.fromisoformat(start.replace("Z", "+00:00"))
+
+    # Book 10:30-11:00 -> free gaps are 10:00-10:30 and 11:00-12:00
+    rb = client.post("/api/public/appointments", json={
+        "start_at": iso(base + timedelta(minutes=30)),
+        "end_at": iso(base + timedelta(minutes=60)),
+        "patient_name": "A",
+    })
+    assert rb.status_code == 201, rb.text
+
+    w_from, w_to = day_window
+    rs = client.get(f"/api/public/blocks?from={w_from}&to={w_to}&duration=60")
+    assert rs.status_code == 200, rs.text
+    blocks = rs.json()
+    assert len(blocks) == 1
+    assert "T11:00" in blocks[0]["start_at"] and "T12:00" in blocks[0]["end_at"]
+
+    # Finer alignment yields more candidates; limit truncates
+    rs = client.get(f"/api/public/blocks?from={w_from}&to={w_to}&duration=45&step=15")
+    starts = [b["start_at"] for b in rs.json()]
+    assert len(starts) == 2 and "T11:00" in starts[0] and "T11:15" in starts[1]
+    rs = client.get(f"/api/public/blocks?from={w_from}&to={w_to}&duration=30&limit=1")
+    assert len(rs.json()) == 1
+
+    # A returned block is bookable as a single appointment
+    b = blocks[0]
+    rb = client.post("/api/public/appointments", json={
+        "start_at": b["start_at"], "end_at": b["end_at"], "patient_name": "B"
+    })
+    assert rb.status_code == 201, rb.text
+
+def test_free_blocks_rejects_bad_params(client, day_window):
+    w_from, w_to = day_window
+    assert client.get(f"/api/public/blocks?from={w_from}&to={w_to}&duration=0").status_code == 422
+    assert client.get(f"/api/public/blocks?from={w_to}&to={w_from}&duration=30").status_code == 422
+
+def test_free_gaps_single_pass_across_ranges():
+    from datetime import datetime as dt
+    from app.services.slots import _free_gaps, _merge_busy
+
+    h = lambda hour, minute=0: dt(2030, 1, 1, hour, minute)
+    busy = _merge_busy([(h(9), h(9, 30)), (h(9, 15), h(10)), (h(11, 30), h(13, 30)), (h(15), h(15, 30))])
+    assert busy == [(h(9), h(10)), (h(11, 30), h(13, 30)), (h(15), h(15, 30))]
+
+    gaps, i = _free_gaps(h(9), h(12), busy)
+    assert gaps == [(h(10), h(11, 30))]
+    # The interval spilling past 12:00 is kept for the next range
+    gaps, i = _free_gaps(h(13), h(16), busy, i)
+    assert gaps == [(h(13, 30), h(15)), (h(15, 30), h(16))]
+    assert i == len(busy)
@@ -0,0 +1,56 @@
+import time
+import uuid
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from app.config import settings
+from app.db import engine
+from app.model import IdempotencyKey, _utcnow_naive
+from app.services import idempotency
+
+def test_retry_with_same_key_replays_original_201(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={"start_at": start, "end_at": end, "is_active": True})
+    body = {"start_at": start, "end_at": start.replace("10:00", "10:30"), "patient_name": "A"}
+    hdr = {"Idempotency-Key": str(uuid.uuid4())}
+
+    r1 = client.post("/api/public/appointments", json=body, headers=hdr)
+    assert r1.status_code == 201, r1.text
+    r2 = client.post("/api/public/appointments", json=body, headers=hdr)
+    assert r2.status_code == 201, r2.text
+    assert r2.json() == r1.json()
+    assert r2.headers.get("idempotent-replayed") == "true"
+
+    # Only one appointment was created
+    appts = client.get("/api/doctor/appointments", headers=auth_header).json()
+    assert len(appts) == 1
+
+    # Survives a cold in-memory cache (e.g. another worker) via the persisted table
+    idempotency._replay_cache.clear()
+    r3 = client.post("/api/public/appointments", json=body, headers=hdr)
+    assert r3.status_code == 201 and r3.json()["id"] == r1.json()["id"]
+
+    # Without the key the same body is a genuine duplicate
+    r4 = client.post("/api/public/appointments", json=body)
+    assert r4.status_code == 409
+
+def test_key_reused_with_different_body_is_rejected(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    client.post("/api/doctor/availability", headers=auth_header, json={"start_at": start, "end_at": end, "is_active": True})
+    hdr = {"Idempotency-Key": str(uuid.uuid4())}
+    body = {"start_at": start, "end_at": start.replace("10:00", "10:30"), "patient_name": "A"}
+    assert client.post("/api/public/appointments", json=body, headers=hdr).status_code == 201
+    r = client.post("/api/public/appointments", json={**body, "patient_name": "B"}, headers=hdr)
+    assert r.status_code == 422
+
+def test_cache_entry_from_table_keeps_persisted_expiry():
+    key = str(uuid.uuid4())
+    created = _utcnow_naive() - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS - 60)
+    with Session(engine) as session:
+        session.add(IdempotencyKey(key=key, request_hash="h", response_json="{}", created_at=created))
+        session.commit()
+        assert idempotency.lookup(session, key, "h") == (201, {})
+
+    expires_at, _ = idempotency._replay_cache._data[key]
+    assert expires_at - time.monotonic() <= 60
@@ -0,0 +1,49 @@
+import threading
+import time
+
+from app import profiling
+
+def test_profile_header_traces_doctor_request(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    hdr = {**auth_header, "X-Profile": "1"}
+    r = client.post("/api/doctor/availability", headers=hdr, json={"start_at": start, "end_at": end, "is_active": True})
+    assert r.status_code == 201
+    trace_id = r.headers["x-trace-id"]
+
+    listing = client.get("/api/doctor/traces", headers=auth_header).json()
+    assert listing[0]["id"] == trace_id
+    assert listing[0]["path"] == "/api/doctor/availability" and listing[0]["status_code"] == 201
+
+    detail = client.get(f"/api/doctor/traces/{trace_id}", headers=auth_header).json()
+    assert detail["sql_count"] >= 2
+    assert any("INSERT INTO dailyavailability" in q["statement"] for q in detail["sql"])
+    assert all(q["duration_ms"] >= 0 for q in detail["sql"])
+
+def test_profile_header_ignored_without_doctor_auth(client, day_window):
+    w_from, w_to = day_window
+    before = len(profiling.traces)
+    r = client.get(f"/api/public/slots?from={w_from}&to={w_to}", headers={"X-Profile": "1"})
+    assert r.status_code == 200
+    assert "x-trace-id" not in r.headers
+    assert len(profiling.traces) == before
+
+def test_sampler_captures_registered_thread_stack():
+    trace = profiling.RequestTrace("GET", "/x")
+    trace.threads.add(threading.get_ident())
+    trace.start_sampling(0.001)
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    trace.stop_sampling()
+    assert trace.samples > 0
+    assert any("test_sampler_captures_registered_thread_stack" in s["stack"] for s in trace.detail()["stacks"])
+
+def test_traces_require_auth(client):
+    assert client.get("/api/doctor/traces").status_code == 401
+
+def test_traced_response_is_still_compressed(client, auth_header, monkeypatch):
+    monkeypatch.setattr(profiling.settings, "COMPRESSION_MIN_SIZE", 1)
+    r = client.get("/openapi.json", headers={**auth_header, "X-Profile": "1", "Accept-Encoding": "gzip"})
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == "gzip"
+    assert profiling.get_trace(r.headers["x-trace-id"]).status_code == 200
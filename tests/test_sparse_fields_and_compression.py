@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import compression
+from conftest import iso
+
+def _book_many(client, auth_header, start, end, n=4):
+    client.post("/api/doctor/availability", headers=auth_header, json={"start_at": start, "end_at": end, "is_active": True})
+    base = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    for i in range(n):
+        client.post("/api/public/appointments", json={
+            "start_at": iso(base + timedelta(minutes=30 * i)),
+            "end_at": iso(base + timedelta(minutes=30 * (i + 1))),
+            "patient_name": f"P{i}", "note": "x" * 400,
+        })
+
+def test_fields_narrows_appointment_listing(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    _book_many(client, auth_header, start, end)
+
+    full = client.get("/api/doctor/appointments", headers=auth_header).json()
+    r = client.get("/api/doctor/appointments?fields=id,start_at,status", headers=auth_header)
+    assert r.status_code == 200
+    rows = r.json()
+    assert [set(row) for row in rows] == [{"id", "start_at", "status"}] * len(full)
+    assert [row["id"] for row in rows] == [a["id"] for a in full]
+    assert rows[0]["start_at"] == full[0]["start_at"]
+
+    one = client.get("/api/doctor/appointments?fields=id&status=scheduled", headers=auth_header).json()
+    assert one == [{"id": a["id"]} for a in full]
+
+    assert client.get("/api/doctor/appointments?fields=id,doctor_id", headers=auth_header).status_code == 422
+
+def test_large_responses_are_compressed(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    _book_many(client, auth_header, start, end)
+
+    r = client.get("/api/doctor/appointments", headers={**auth_header, "Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert int(r.headers["content-length"]) < len(r.content)  # httpx decodes transparently
+    assert len(r.json()) == 4
+
+    # Small bodies and identity-only clients are left alone
+    small = client.get("/api/public/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    plain = client.get("/api/doctor/appointments", headers={**auth_header, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+def test_brotli_is_preferred_when_available(client, auth_header, tomorrow_10_to_noon):
+    pytest.importorskip("brotli")
+    start, end = tomorrow_10_to_noon
+    _book_many(client, auth_header, start, end)
+    r = client.get("/api/doctor/appointments", headers={**auth_header, "Accept-Encoding": "gzip, br"})
+    assert r.headers["content-encoding"] == "br"
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("identity, gzip;q=0.5", ""),
+    ("*", "br"),
+    ("gzip;q=0, *;q=0.3", "br"),
+    ("identity;q=0, br;q=0, *", "gzip"),
+    ("identity;q=0", ""),
+    ("deflate", ""),
+])
+def test_choose_encoding_honours_q_values(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli_available", lambda: True)
+    assert compression.choose_encoding(header) == expected
+
+def test_compressed_response_has_weak_etag(client, auth_header, tomorrow_10_to_noon, monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MIN_SIZE", 1)
+    start, end = tomorrow_10_to_noon
+    _book_many(client, auth_header, start, end)
+
+    plain = client.get("/api/doctor/calendar.ics", headers={**auth_header, "Accept-Encoding": "identity"})
+    gz = client.get("/api/doctor/calendar.ics", headers={**auth_header, "Accept-Encoding": "gzip"})
+    assert gz.headers["content-encoding"] == "gzip"
+    assert not plain.headers["etag"].startswith("W/")
+    assert gz.headers["etag"] == "W/" + plain.headers["etag"]
+    assert gz.text == plain.text
+
+    r304 = client.get("/api/doctor/calendar.ics", headers={
+        **auth_header, "Accept-Encoding": "gzip", "If-None-Match": gz.headers["etag"],
+    })
+    assert r304.status_code == 304
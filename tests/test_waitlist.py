@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.model import Doctor, FreedSlot, SlotOffer, WaitlistEntry, _utcnow_naive
+from app.services import waitlist
+from app.services.waitlist import expire_offers
+from conftest import iso
+
+def _wait_for_offer(client, entry_id, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        r = client.get(f"/api/public/waitlist/{entry_id}")
+        if r.status_code == 200 and r.json()["offer"]:
+            return r.json()
+        time.sleep(0.05)
+    raise AssertionError("no offer was made")
+
+def _setup(client, auth_header, start, end):
+    client.post("/api/doctor/availability", headers=auth_header, json={"start_at": start, "end_at": end, "is_active": True})
+    base = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    slot = {"start_at": iso(base), "end_at": iso(base + timedelta(minutes=30))}
+    rb = client.post("/api/public/appointments", json={**slot, "patient_name": "Original"})
+    assert rb.status_code == 201
+    waiters = []
+    for name in ("First", "Second"):
+        rw = client.post("/api/public/waitlist", json={
+            "patient_name": name, "range_start": start, "range_end": end,
+        })
+        assert rw.status_code == 201, rw.text
+        waiters.append(rw.json()["id"])
+    return slot, rb.json()["id"], waiters
+
+def test_cancel_offers_slot_to_first_waiter(client, auth_header, tomorrow_10_to_noon, day_window):
+    start, end = tomorrow_10_to_noon
+    slot, appt_id, (first, second) = _setup(client, auth_header, start, end)
+
+    rc = client.patch(f"/api/doctor/appointments/{appt_id}", headers=auth_header, json={"status": "canceled"})
+    assert rc.status_code == 200
+    entry = _wait_for_offer(client, first)
+    assert entry["status"] == "offered" and entry["offer"]["status"] == "pending"
+    assert client.get(f"/api/public/waitlist/{second}").json()["status"] == "waiting"
+
+    # The held slot is neither listed nor bookable by others
+    w_from, w_to = day_window
+    starts = [s["start_at"] for s in client.get(f"/api/public/slots?from={w_from}&to={w_to}").json()]
+    assert not any("T10:00" in s for s in starts)
+    r = client.post("/api/public/appointments", json={**slot, "patient_name": "Intruder"})
+    assert r.status_code == 409
+
+    ra = client.post(f"/api/public/waitlist/{first}/accept")
+    assert ra.status_code == 201, ra.text
+    assert ra.json()["patient_name"] == "First"
+    assert client.get(f"/api/public/waitlist/{first}").json()["status"] == "booked"
+    assert client.post(f"/api/public/waitlist/{first}/accept").status_code == 409
+
+def test_expired_offer_moves_to_next_waiter(client, auth_header, tomorrow_10_to_noon):
+    start, end = tomorrow_10_to_noon
+    slot, appt_id, (first, second) = _setup(client, auth_header, start, end)
+    client.patch(f"/api/doctor/appointments/{appt_id}", headers=auth_header, json={"status": "canceled"})
+    _wait_for_offer(client, first)
+
+    with Session(engine) as session:
+        offer = session.exec(select(SlotOffer).where(SlotOffer.waitlist_id == first)).one()
+        offer.expires_at = _utcnow_naive() - timedelta(seconds=1)
+        session.add(offer)
+        session.commit()
+        assert expire_offers(session) == 1
+
+    assert client.get(f"/api/public/waitlist/{first}").json()["status"] == "lapsed"
+    entry = client.get(f"/api/public/waitlist/{second}").json()
+    assert entry["status"] == "offered"
+    assert client.post(f"/api/public/waitlist/{first}/accept").status_code == 409
+
+def test_sweep_offers_slot_whose_wakeup_was_lost(client, auth_header, tomorrow_10_to_noon, monkeypatch):
+    start, end = tomorrow_10_to_noon
+    slot, appt_id, (first, _) = _setup(client, auth_header, start, end)
+    monkeypatch.setattr(waitlist.worker, "notify", lambda: None)  # e.g. process exited after commit
+
+    client.patch(f"/api/doctor/appointments/{appt_id}", headers=auth_header, json={"status": "canceled"})
+    assert client.get(f"/api/public/waitlist/{first}").json()["status"] == "waiting"
+
+    with Session(engine) as session:
+        waitlist.sweep(session)
+        assert session.exec(select(FreedSlot)).first() is None
+    assert client.get(f"/api/public/waitlist/{first}").json()["status"] == "offered"
+
+def test_sweep_retires_entries_past_their_range(client):
+    with Session(engine) as session:
+        doctor = session.exec(select(Doctor)).one()
+        past = _utcnow_naive() - timedelta(days=1)
+        entry = WaitlistEntry(doctor_id=doctor.id, patient_name="Late", range_start=past - timedelta(hours=2), range_end=past)
+        session.add(entry)
+        session.commit()
+        entry_id = entry.id
+        waitlist.sweep(session)
+    assert client.get(f"/api/public/waitlist/{entry_id}").json()["status"] == "expired"
+
+def test_matching_query_seeks_range_index(client):
+    now = _utcnow_naive()
+    with Session(engine) as session:
+        plan = session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT * FROM waitlistentry WHERE doctor_id = :d AND status = 'waiting' "
+                "AND range_start <= :s AND range_end >= :e ORDER BY created_at LIMIT 1"
+            ),
+            {"d": "x", "s": now, "e": now},
+        ).all()
+    detail = " ".join(row[-1] for row in plan)
+    # A range-bounded index search, not a walk over every waiting entry of the doctor
+    assert "ix_waitlist_range" in detail and "range_start<?" in detail
+    assert "SCAN waitlistentry" not in detail